@@ -6,40 +6,61 @@
 # ver historial, obtener diffs y gestionar el área de staging, integrando el core Python.
 # Cada endpoint está documentado para máxima comprensión.
 #
-# Dependencias: fastapi, uvicorn, pydantic, core/
+# Dependencias: fastapi, uvicorn, pydantic, aiofiles, orjson, core/
 # Estructura: utiliza modelos Pydantic para validación y clases adaptadoras para el core.
 # ===============================
 
-# Requiere: fastapi, uvicorn, pydantic
+# Requiere: fastapi, uvicorn, pydantic, aiofiles, orjson
 # Requisitos:
 # - Python 3.7+
 
 import sys
 import os
-import json
+import re
+import stat
+import asyncio
+import time
+import heapq
+import concurrent.futures
+from contextlib import asynccontextmanager
 from datetime import datetime
 import hashlib
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import List
+from fastapi.responses import FileResponse, ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict
+import aiofiles
+import orjson
 
 # Añadir el directorio padre al PATH para importar core/
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Importar las clases existentes del proyecto
 from core.repository import Repository
-from core.commit import Commit
+from core.commit import Commit, timestamp_ns
 # Importar WebRepository para funcionalidades avanzadas
 from backend.minigit_core import WebRepository
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque y parada de la aplicación: carga index.html en memoria y, al
+    parar, cierra el pool de procesos del worker.
+    """
+    load_index_html()
+    try:
+        yield
+    finally:
+        shutdown_executor()
+
 # Inicializar la aplicación FastAPI
-app = FastAPI(title="Mini-Git Web API", version="1.0.0")
+app = FastAPI(title="Mini-Git Web API", version="1.0.0", default_response_class=ORJSONResponse,
+              lifespan=lifespan)
 
 # Middleware CORS para permitir peticiones desde cualquier origen (desarrollo)
 app.add_middleware(
@@ -50,37 +71,164 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Extensiones que ya vienen comprimidas: volver a comprimirlas solo gasta CPU
+PRECOMPRESSED_EXTENSIONS = {
+    '.gz', '.tgz', '.bz2', '.xz', '.zst', '.zip', '.7z', '.rar',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp3', '.mp4', '.pdf',
+}
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware que no recomprime archivos cuyo formato ya está comprimido
+    (por ejemplo /api/file_raw/foto.png).
+    """
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and os.path.splitext(scope["path"])[1].lower() in PRECOMPRESSED_EXTENSIONS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# Compresión gzip de respuestas grandes (historial, listados, contenido de archivos)
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Servir archivos estáticos del frontend (HTML, JS, CSS)
 FRONTEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
-app.mount("/static", StaticFiles(directory=os.path.join(FRONTEND_PATH)), name="static")
+# Rutas constantes precalculadas una sola vez al cargar el módulo
+INDEX_HTML = os.path.join(FRONTEND_PATH, "index.html")
+app.mount("/static", StaticFiles(directory=FRONTEND_PATH), name="static")
+
+# index.html se carga una sola vez en memoria junto con su ETag
+INDEX_BYTES: Optional[bytes] = None
+INDEX_ETAG: Optional[str] = None
+
+def load_index_html():
+    """Lee index.html al arrancar y calcula su ETag."""
+    global INDEX_BYTES, INDEX_ETAG
+    with open(INDEX_HTML, 'rb') as f:
+        INDEX_BYTES = f.read()
+    INDEX_ETAG = '"' + hashlib.blake2b(INDEX_BYTES, digest_size=8).hexdigest() + '"'
 
 # Endpoint raíz: sirve el index.html del frontend
 @app.get("/")
-async def root():
-    """Devuelve la página principal del frontend web."""
-    return FileResponse(os.path.join(FRONTEND_PATH, "index.html"))
+async def root(request: Request):
+    """
+    Devuelve la página principal del frontend web desde memoria.
+    Responde 304 si el navegador ya tiene la versión actual (If-None-Match).
+    """
+    if INDEX_BYTES is None:
+        load_index_html()
+    headers = {"ETag": INDEX_ETAG, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == INDEX_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(INDEX_BYTES, media_type="text/html", headers=headers)
 
 # ===============================
 # Modelos Pydantic para validación de datos
 # ===============================
 class FileModel(BaseModel):
     """Modelo para archivos enviados/recibidos por la API."""
+    model_config = ConfigDict(extra='forbid', frozen=True)
     name: str
     content: str
 
 class CommitModel(BaseModel):
     """Modelo para datos de commit enviados por el frontend."""
+    model_config = ConfigDict(extra='forbid', frozen=True)
     message: str
     files: Optional[List[str]] = []
 
 class StatusResponse(BaseModel):
     """Modelo de respuesta para el estado del repositorio."""
+    model_config = ConfigDict(extra='forbid', frozen=True)
     initialized: bool
     current_branch: str
     total_commits: int
     staged_files: List[str]
     working_directory: str
 
+# Tiempo de vida (segundos) de los listados cacheados de archivos e historial
+LISTING_CACHE_TTL = 0.2
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """
+    Escribe `data` en un archivo temporal junto a `path` y lo renombra encima.
+    Un lector nunca ve el archivo a medio escribir.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+# ===============================
+# Pool de procesos para trabajo CPU-bound (hash de archivos en commits)
+# ===============================
+# Procesos por worker: con Gunicorn cada worker tiene su propio pool, así que
+# un pool de os.cpu_count() en cada uno multiplicaría los procesos
+COMMIT_POOL_WORKERS = 2
+
+# Segundos que una escritura del staging espera a que otro worker libere .mygit/index.lock
+INDEX_LOCK_TIMEOUT = 30.0
+
+# El pool se crea al primer commit de cada worker y se cierra al parar la app
+_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+def get_executor() -> concurrent.futures.ProcessPoolExecutor:
+    """Devuelve el pool de procesos de este worker, creándolo la primera vez."""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ProcessPoolExecutor(max_workers=COMMIT_POOL_WORKERS)
+    return _executor
+
+def shutdown_executor() -> None:
+    """Cierra el pool de procesos de este worker, si llegó a crearse."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+def _in_transaction(repo: Repository, fn, *args):
+    """
+    Ejecuta fn(*args) con .mygit/index.lock tomado. El asyncio.Lock de
+    MiniGitCore solo ordena las peticiones de un worker; el index.lock ordena
+    también las de los demás workers y cualquier otro uso de
+    Repository.staging_transaction() sobre el mismo repositorio.
+    """
+    with repo.staging_transaction(timeout=INDEX_LOCK_TIMEOUT):
+        return fn(*args)
+
+def _update_repo_file(repo_file: str, update) -> None:
+    """
+    Lee repository.json, le aplica update(repo_data) y lo reescribe de forma atómica.
+    Debe llamarse con index.lock tomado para que dos workers no pisen sus cambios.
+    Si el archivo no existe no hace nada (es opcional, solo por compatibilidad).
+    """
+    try:
+        with open(repo_file, 'rb') as f:
+            repo_data = orjson.loads(f.read())
+    except FileNotFoundError:
+        return
+    update(repo_data)
+    _atomic_write(repo_file, orjson.dumps(repo_data, option=orjson.OPT_INDENT_2))
+
+def _do_commit(repo_path: str, repo_file: str, message: str) -> str:
+    """
+    Crea un commit con el core en un proceso del pool (fuera del GIL del servidor).
+    Debe ser una función de módulo para que pueda serializarse con pickle.
+    """
+    repo = Repository(repo_path)
+
+    def commit_and_record() -> str:
+        commit_hash = Commit(repo).create(message)
+
+        def record(repo_data: Dict[str, Any]) -> None:
+            repo_data['last_commit'] = commit_hash
+            repo_data['staged_files'] = []
+
+        _update_repo_file(repo_file, record)
+        return commit_hash
+
+    return _in_transaction(repo, commit_and_record)
+
 # ===============================
 # Clase adaptadora para el core Mini-Git
 # ===============================
@@ -93,29 +241,90 @@ class MiniGitCore:
         self.repo_path = repo_path
         self.repo_file = os.path.join(repo_path, ".mingit", "repository.json")
         self.commits_dir = os.path.join(repo_path, ".mingit", "commits")
+        # Prefijo precalculado para construir rutas de commits sin os.path.join
+        self._commits_prefix = self.commits_dir + os.sep
+        # Raíz real del repo (sin symlinks) para validar rutas recibidas por la API
+        self._real_root_prefix = os.path.realpath(repo_path) + os.sep
+        # Caché de repository.json: (st_mtime_ns, datos parseados)
+        self._repo_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+        # Instancia única del Repository del core, creada bajo demanda
+        self._repo: Optional[Repository] = None
+        # Cachés de corta duración para /api/files y /api/log: (instante, resultado)
+        self._files_cache: Tuple[float, Optional[List[str]]] = (0.0, None)
+        self._log_cache: Tuple[float, Optional[List[Dict[str, Any]]]] = (0.0, None)
+        # Serializa las secuencias leer→modificar→escribir del staging y repository.json
+        # dentro de este worker; entre workers el staging se protege con index.lock
+        self._write_lock = asyncio.Lock()
+
+    def invalidate_caches(self) -> None:
+        """Descarta los listados cacheados (tras init, add, commit o delete)."""
+        self._files_cache = (0.0, None)
+        self._log_cache = (0.0, None)
+
+    def resolve_path(self, file_path: str) -> str:
+        """
+        Devuelve la ruta absoluta de un archivo del repo.
+        Lanza HTTP 400 si la ruta intenta salir del repositorio (p.ej. '../').
+        """
+        full_path = os.path.realpath(os.path.join(self.repo_path, file_path))
+        if not full_path.startswith(self._real_root_prefix):
+            raise HTTPException(status_code=400, detail="Ruta de archivo inválida")
+        return full_path
+
+    def _get_repo(self) -> Repository:
+        """
+        Devuelve el Repository del core, reutilizando la misma instancia entre peticiones.
+        """
+        if self._repo is None:
+            self._repo = Repository(self.repo_path)
+        return self._repo
+
+    async def _read_repo(self) -> Dict[str, Any]:
+        """
+        Lee repository.json usando la caché en memoria.
+        Solo vuelve a parsear el archivo si cambió su mtime.
+        """
+        st = await asyncio.to_thread(os.stat, self.repo_file)
+        if self._repo_cache and self._repo_cache[0] == st.st_mtime_ns:
+            return self._repo_cache[1]
+        async with aiofiles.open(self.repo_file, 'rb') as f:
+            repo_data = orjson.loads(await f.read())
+        self._repo_cache = (st.st_mtime_ns, repo_data)
+        return repo_data
+
+    async def _write_repo(self, repo_data: Dict[str, Any]) -> None:
+        """
+        Escribe repository.json de forma atómica y actualiza la caché con el nuevo mtime.
+        """
+        data = orjson.dumps(repo_data, option=orjson.OPT_INDENT_2)
+        await asyncio.to_thread(_atomic_write, self.repo_file, data)
+        st = await asyncio.to_thread(os.stat, self.repo_file)
+        self._repo_cache = (st.st_mtime_ns, repo_data)
     
-    def init_repository(self) -> Dict[str, Any]:
+    async def init_repository(self) -> Dict[str, Any]:
         """
         Inicializa un repositorio Mini-Git en el directorio dado.
         Crea carpetas y archivos de control si no existen.
         Retorna dict con éxito y mensaje.
         """
         try:
-            os.makedirs(self.repo_path, exist_ok=True)
-            os.makedirs(os.path.dirname(self.repo_file), exist_ok=True)
-            os.makedirs(self.commits_dir, exist_ok=True)
-            # Inicializa la estructura del core (.mygit)
-            repo = Repository(self.repo_path)
-            repo.init()
-            # Crear repository.json si no existe
-            if not os.path.exists(self.repo_file):
-                repo_data = {
-                    "current_branch": "main",
-                    "staged_files": [],
-                    "last_commit": None
-                }
-                with open(self.repo_file, 'w') as f:
-                    json.dump(repo_data, f, indent=2)
+            await asyncio.to_thread(os.makedirs, self.repo_path, exist_ok=True)
+            await asyncio.to_thread(os.makedirs, os.path.dirname(self.repo_file), exist_ok=True)
+            await asyncio.to_thread(os.makedirs, self.commits_dir, exist_ok=True)
+            async with self._write_lock:
+                # Inicializa la estructura del core (.mygit)
+                self._repo = None
+                self.invalidate_caches()
+                repo = self._get_repo()
+                await asyncio.to_thread(repo.init)
+                # Crear repository.json si no existe
+                if not await asyncio.to_thread(os.path.exists, self.repo_file):
+                    repo_data = {
+                        "current_branch": "main",
+                        "staged_files": [],
+                        "last_commit": None
+                    }
+                    await self._write_repo(repo_data)
             return {
                 "success": True, 
                 "message": "Repositorio inicializado correctamente",
@@ -124,12 +333,14 @@ class MiniGitCore:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al inicializar: {str(e)}")
 
-    def get_status(self) -> StatusResponse:
+    async def get_status(self) -> StatusResponse:
         """
         Devuelve el estado actual del repositorio: si está inicializado, branch, commits, archivos staged, etc.
         """
         try:
-            if not os.path.exists(self.repo_file):
+            try:
+                repo_data = await self._read_repo()
+            except FileNotFoundError:
                 return StatusResponse(
                     initialized=False,
                     current_branch="main",
@@ -137,11 +348,12 @@ class MiniGitCore:
                     staged_files=[],
                     working_directory=self.repo_path
                 )
-            with open(self.repo_file, 'r') as f:
-                repo_data = json.load(f)
             commits_count = 0
-            if os.path.exists(self.commits_dir):
-                commits_count = len([f for f in os.listdir(self.commits_dir) if f.endswith('.json')])
+            try:
+                commit_names = await asyncio.to_thread(os.listdir, self.commits_dir)
+                commits_count = len([f for f in commit_names if f.endswith('.json')])
+            except FileNotFoundError:
+                pass
             staged_files = repo_data.get('staged_files', [])
             return StatusResponse(
                 initialized=True,
@@ -153,58 +365,75 @@ class MiniGitCore:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al obtener estado: {str(e)}")
     
-    def add_files(self, files: List[FileModel]) -> Dict[str, Any]:
+    async def _write_one(self, file_path: str, file_data: FileModel) -> None:
+        """
+        Escribe el contenido de un archivo en el directorio de trabajo.
+        `file_path` ya viene validado por resolve_path y su carpeta debe
+        existir previamente (add_files la crea).
+        """
+        async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+            await f.write(file_data.content)
+
+    async def add_files(self, files: List[FileModel]) -> Dict[str, Any]:
         """
         Añade archivos al área de staging y los guarda físicamente en el repo.
         Actualiza el archivo de control para reflejar el staging.
         """
         try:
-            created_files = []
-            repo = Repository(self.repo_path)
-            for file_data in files:
-                file_path = os.path.join(self.repo_path, file_data.name)
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(file_data.content)
-                created_files.append(file_data.name)
-                # Agregar al staging del core
-                repo.add_file(file_data.name)
-            # Actualizar repository.json (opcional, para mantener compatibilidad)
-            if os.path.exists(self.repo_file):
-                with open(self.repo_file, 'r') as f:
-                    repo_data = json.load(f)
+            # Validar todas las rutas antes de crear carpetas o escribir nada
+            # (si un nombre se repite gana la última versión, como al escribir en orden)
+            latest = {f.name: f for f in files}
+            full_paths = {name: self.resolve_path(name) for name in latest}
+            repo = self._get_repo()
+            self.invalidate_caches()
+            # Crear cada carpeta una sola vez aunque contenga varios archivos
+            dir_paths = {os.path.dirname(path) for path in full_paths.values()}
+            await asyncio.gather(*(
+                asyncio.to_thread(os.makedirs, dir_path, exist_ok=True) for dir_path in dir_paths
+            ))
+            # Escribir todos los archivos de forma concurrente
+            await asyncio.gather(*(self._write_one(full_paths[name], f) for name, f in latest.items()))
+            created_files = list(latest)
+
+            def record(repo_data: Dict[str, Any]) -> None:
                 staged_files = repo_data.get('staged_files', [])
                 for file_name in created_files:
                     if file_name not in staged_files:
                         staged_files.append(file_name)
                 repo_data['staged_files'] = staged_files
-                with open(self.repo_file, 'w') as f:
-                    json.dump(repo_data, f, indent=2)
+
+            def stage_and_record() -> None:
+                # Agregar al staging del core en una sola lectura/escritura
+                repo.add_files(created_files)
+                # Actualizar repository.json (opcional, para mantener compatibilidad)
+                _update_repo_file(self.repo_file, record)
+
+            async with self._write_lock:
+                # Staging y repository.json bajo el mismo index.lock
+                await asyncio.to_thread(_in_transaction, repo, stage_and_record)
             return {
                 "success": True,
                 "message": f"Archivos añadidos: {', '.join(created_files)}",
                 "files": created_files
             }
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al añadir archivos: {str(e)}")
     
-    def create_commit(self, message: str, files: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def create_commit(self, message: str, files: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Crea un nuevo commit usando la lógica del core.
         Limpia el área de staging tras el commit.
         """
         try:
-            repo = Repository(self.repo_path)
-            commit = Commit(repo)
-            commit_hash = commit.create(message)
-            # Limpiar staged_files en repository.json
-            if os.path.exists(self.repo_file):
-                with open(self.repo_file, 'r') as f:
-                    repo_data = json.load(f)
-                repo_data['last_commit'] = commit_hash
-                repo_data['staged_files'] = []
-                with open(self.repo_file, 'w') as f:
-                    json.dump(repo_data, f, indent=2)
+            loop = asyncio.get_running_loop()
+            async with self._write_lock:
+                # El proceso del pool también limpia staged_files en repository.json
+                commit_hash = await loop.run_in_executor(
+                    get_executor(), _do_commit, self.repo_path, self.repo_file, message
+                )
+                self.invalidate_caches()
             return {
                 "success": True,
                 "message": "Commit creado exitosamente",
@@ -213,19 +442,38 @@ class MiniGitCore:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al crear commit: {str(e)}")
     
-    def get_commit_history(self, limit: int = 10) -> List[Dict[str, Any]]:
+    async def get_commit_history(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Devuelve el historial de commits (ordenados por fecha descendente).
         """
         try:
-            repo = Repository(self.repo_path)
-            commits = repo.get_commits()
-            # Ordenar por timestamp descendente
-            commits = sorted(commits, key=lambda c: c.get('timestamp', ''), reverse=True)
-            return commits[:limit]
+            now = time.monotonic()
+            ts, commits = self._log_cache
+            if commits is None or now - ts >= LISTING_CACHE_TTL:
+                repo = self._get_repo()
+                commits = await asyncio.to_thread(repo.get_commits)
+                self._log_cache = (now, commits)
+            # Los `limit` más recientes por timestamp: O(N log K) en lugar de ordenar todo
+            return heapq.nlargest(limit, commits, key=lambda c: timestamp_ns(c.get('timestamp', 0)))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al obtener historial: {str(e)}")
 
+    async def list_files(self) -> List[str]:
+        """
+        Lista los archivos de usuario del repo, reutilizando el último listado
+        si tiene menos de LISTING_CACHE_TTL segundos.
+        """
+        now = time.monotonic()
+        ts, files = self._files_cache
+        if files is not None and now - ts < LISTING_CACHE_TTL:
+            return files
+        files = await asyncio.to_thread(_walk_scandir, self.repo_path)
+        self._files_cache = (now, files)
+        return files
+
+# Hash de commit válido: solo hexadecimal (evita rutas arbitrarias sin tocar el disco)
+_HASH_RE = re.compile(r'^[0-9a-f]{8,64}$')
+
 # Instancia global del core y del adaptador avanzado para funcionalidades extra
 mini_git = MiniGitCore()
 web_repo = WebRepository("./mini_git_repo")
@@ -237,27 +485,27 @@ web_repo = WebRepository("./mini_git_repo")
 @app.post("/api/init")
 async def init_repository():
     """Inicializa el repositorio Mini-Git (estructura y archivos de control)."""
-    return mini_git.init_repository()
+    return await mini_git.init_repository()
 
-@app.get("/api/status")
+@app.get("/api/status", response_model=StatusResponse)
 async def get_status():
     """Devuelve el estado actual del repositorio (branch, commits, archivos staged, etc)."""
-    return mini_git.get_status()
+    return await mini_git.get_status()
 
 @app.post("/api/add")
 async def add_files(files: List[FileModel]):
     """Agrega archivos al repositorio y los añade al área de staging."""
-    return mini_git.add_files(files)
+    return await mini_git.add_files(files)
 
 @app.post("/api/commit")
 async def create_commit(commit_data: CommitModel):
     """Crea un nuevo commit con los archivos staged."""
-    return mini_git.create_commit(commit_data.message, commit_data.files)
+    return await mini_git.create_commit(commit_data.message, commit_data.files)
 
 @app.get("/api/log")
 async def get_commit_history(limit: int = 10):
     """Devuelve el historial de commits (limit configurable)."""
-    return mini_git.get_commit_history(limit)
+    return await mini_git.get_commit_history(limit)
 
 @app.get("/api/commit/{commit_hash}")
 async def get_commit_details(commit_hash: str):
@@ -265,32 +513,60 @@ async def get_commit_details(commit_hash: str):
     Devuelve los detalles de un commit específico (por hash).
     Retorna error 404 si no existe.
     """
+    if not _HASH_RE.match(commit_hash):
+        raise HTTPException(status_code=400, detail="Hash de commit inválido")
     try:
-        commit_file = os.path.join(mini_git.commits_dir, f"{commit_hash}.json")
-        if not os.path.exists(commit_file):
-            raise HTTPException(status_code=404, detail="Commit no encontrado")
-        with open(commit_file, 'r') as f:
-            return json.load(f)
+        commit_file = mini_git._commits_prefix + commit_hash + ".json"
+        # El archivo ya es JSON: se devuelve tal cual, sin parsear ni re-serializar
+        async with aiofiles.open(commit_file, 'rb') as f:
+            return Response(content=await f.read(), media_type="application/json")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Commit no encontrado")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener commit: {str(e)}")
 
+def _walk_scandir(root: str) -> List[str]:
+    """
+    Recorre el repositorio con os.scandir (pila iterativa) y devuelve los paths relativos
+    de los archivos de usuario. Las carpetas ocultas se podan antes de descender y
+    DirEntry.is_dir() reutiliza el tipo leído del directorio (sin stat extra).
+    Igual que os.walk: las carpetas ilegibles se omiten, los symlinks a archivos se
+    listan y los symlinks a carpetas no se recorren.
+    """
+    files = []
+    prefix_len = len(os.path.join(root, ''))
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue  # Carpeta borrada o sin permisos: se omite, como os.walk
+        with it:
+            try:
+                for entry in it:
+                    name = entry.name
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        # Excluir carpetas ocultas y no seguir symlinks
+                        if not name.startswith(('.', '__')) and not entry.is_symlink():
+                            stack.append(entry.path)
+                    # Excluir archivos ocultos y de configuración
+                    elif not name.startswith('.') and not name.endswith('.json'):
+                        files.append(entry.path[prefix_len:])
+            except OSError:
+                continue
+    return files
+
 @app.get("/api/files")
 async def list_files():
     """
     Lista todos los archivos de usuario en el repositorio (excluye carpetas y archivos ocultos/configuración).
     """
     try:
-        files = []
-        for root, dirs, filenames in os.walk(mini_git.repo_path):
-            # Excluir carpetas ocultas
-            dirs[:] = [d for d in dirs if not d.startswith('.') and not d.startswith('__')]
-            for filename in filenames:
-                # Excluir archivos ocultos y de configuración
-                if filename.startswith('.') or filename.endswith('.json'):
-                    continue
-                file_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(file_path, mini_git.repo_path)
-                files.append(rel_path)
+        files = await mini_git.list_files()
         return {"files": files}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al listar archivos: {str(e)}")
@@ -302,36 +578,68 @@ async def get_file_content(file_path: str):
     Retorna error 404 si no existe.
     """
     try:
-        full_path = os.path.join(mini_git.repo_path, file_path)
-        if not os.path.exists(full_path) or not os.path.isfile(full_path):
+        full_path = mini_git.resolve_path(file_path)
+        # Un único stat en lugar de exists + isfile
+        try:
+            st = await asyncio.to_thread(os.stat, full_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        if not stat.S_ISREG(st.st_mode):
             raise HTTPException(status_code=404, detail="Archivo no encontrado")
-        with open(full_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        async with aiofiles.open(full_path, 'r', encoding='utf-8') as f:
+            content = await f.read()
         return {"name": file_path, "content": content}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al leer archivo: {str(e)}")
 
+@app.get("/api/file_raw/{file_path:path}")
+async def get_file_raw(file_path: str):
+    """
+    Devuelve el archivo tal cual (sin envolverlo en JSON) usando FileResponse,
+    que lo envía por streaming (sendfile) sin cargarlo entero en memoria.
+    Retorna error 404 si no existe.
+    """
+    full_path = mini_git.resolve_path(file_path)
+    try:
+        st = await asyncio.to_thread(os.stat, full_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    # Se reutiliza el stat ya hecho para no repetir la llamada al sistema
+    return FileResponse(
+        full_path,
+        filename=os.path.basename(file_path),
+        content_disposition_type="inline",
+        stat_result=st,
+    )
+
 @app.delete("/api/file/{file_path:path}")
 async def delete_file(file_path: str):
     """
     Elimina un archivo del repositorio y lo quita del área de staging si corresponde.
     Retorna error 404 si no existe.
     """
-    import os
-    from core.repository import Repository
-    repo_path = mini_git.repo_path
-    abs_path = os.path.join(repo_path, file_path)
-    if not os.path.exists(abs_path):
-        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    abs_path = mini_git.resolve_path(file_path)
     try:
-        os.remove(abs_path)
-        # Quitar del staging si está
-        repo = Repository(repo_path)
+        # EAFP: se intenta borrar directamente (una sola llamada al sistema)
         try:
-            repo.remove_file_from_staging(file_path)
-        except Exception:
-            pass
+            await asyncio.to_thread(os.remove, abs_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        mini_git.invalidate_caches()
+        # Quitar del staging si está
+        repo = mini_git._get_repo()
+        async with mini_git._write_lock:
+            try:
+                await asyncio.to_thread(_in_transaction, repo, repo.remove_file_from_staging, file_path)
+            except Exception:
+                pass
         return {"success": True, "message": f"Archivo eliminado: {file_path}"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al eliminar archivo: {str(e)}")
 
@@ -341,6 +649,7 @@ async def get_file_diff(file_path: str):
     Devuelve el diff entre el archivo actual y la última versión commiteada.
     Retorna error 404 si no se puede obtener el diff.
     """
+    mini_git.resolve_path(file_path)
     result = web_repo.get_file_diff(file_path)
     if not result.get('success', False):
         raise HTTPException(status_code=404, detail=result.get('error', 'No se pudo obtener el diff'))
@@ -352,6 +661,7 @@ async def stage_file(file_path: str):
     Agrega un archivo al área de staging (granular).
     Retorna error 400 si falla.
     """
+    mini_git.resolve_path(file_path)
     result = web_repo.stage_file(file_path)
     if not result.get('success', False):
         raise HTTPException(status_code=400, detail=result.get('error', 'No se pudo agregar al staging'))
@@ -363,6 +673,7 @@ async def unstage_file(file_path: str):
     Quita un archivo del área de staging (granular).
     Retorna error 400 si falla.
     """
+    mini_git.resolve_path(file_path)
     result = web_repo.unstage_file(file_path)
     if not result.get('success', False):
         raise HTTPException(status_code=400, detail=result.get('error', 'No se pudo quitar del staging'))
@@ -373,7 +684,18 @@ async def unstage_file(file_path: str):
 # ===============================
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # MINIGIT_RELOAD=1 activa la recarga automática (un solo worker, útil en desarrollo)
+    reload = os.environ.get("MINIGIT_RELOAD") == "1"
+    uvicorn.run(
+        "backend.app:app",
+        host="0.0.0.0",
+        port=8000,
+        # uvloop no está disponible en Windows: allí se usa el loop estándar de asyncio
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        reload=reload,
+        workers=1 if reload else (os.cpu_count() or 1) * 2 + 1,
+    )
 # ===============================
 # FIN DEL ARCHIVO PRINCIPAL DE BACKEND
 # ===============================
\ No newline at end of file
@@ -0,0 +1,15 @@
+# Configuración de Gunicorn para producción.
+# Ejecutar desde la carpeta backend/:
+#   gunicorn app:app -c gunicorn.conf.py
+# (Gunicorn no funciona en Windows; allí usar `python app.py`.)
+
+import os
+
+# Un worker de Uvicorn por núcleo (x2 + 1): los commits y hashes son CPU-bound.
+# Cada worker crea su propio pool de commits pequeño (COMMIT_POOL_WORKERS en app.py)
+# la primera vez que lo necesita, y los cambios del staging entre workers se
+# ordenan con .mygit/index.lock.
+workers = 2 * (os.cpu_count() or 1) + 1
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = "0.0.0.0:8000"
+keepalive = 5
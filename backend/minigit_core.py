@@ -7,49 +7,450 @@
 # Cada clase y método está documentado para máxima comprensión.
 #
 # Usado por: backend/app.py (API REST)
-# Dependencias: Python 3.7+, dataclasses, difflib, os, json
+# Dependencias: Python 3.10+, dataclasses, difflib, os, orjson, msgpack, cdifflib, bsdiff4 y zstandard (opcionales)
 # ===============================
 
 # minigit_core.py - Core logic adaptado para la web interface
 import os
-import json
 import hashlib
+import sqlite3
+import threading
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+from itertools import islice
 import difflib
+import re
+import orjson
 
-@dataclass
-class FileSnapshot:
+# Deltas binarios entre versiones de un archivo (opcional: sin bsdiff4 todo se guarda completo)
+try:
+    import bsdiff4
+except ImportError:  # pragma: no cover - depende del entorno
+    bsdiff4 = None
+
+# Si cdifflib está instalado, difflib usa su SequenceMatcher en C (mismo resultado)
+try:
+    from cdifflib import CSequenceMatcher
+    difflib.SequenceMatcher = CSequenceMatcher
+except ImportError:  # pragma: no cover - depende del entorno
+    pass
+
+# Formato en disco de commits y staging: msgpack si está instalado, si no JSON (orjson).
+# Los archivos .json de versiones anteriores se siguen pudiendo leer.
+try:
+    import msgpack
+
+    DATA_EXT = '.msgpack'
+
+    def _dumps(obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def _loads(buf: bytes) -> Any:
+        return msgpack.unpackb(buf, raw=False)
+except ImportError:  # pragma: no cover - depende del entorno
+    DATA_EXT = '.json'
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+
+# Compresión zstd de commits, staging y blobs (opcional). Se detecta por el número
+# mágico del frame, así que los archivos sin comprimir anteriores se siguen leyendo.
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depende del entorno
+    zstandard = None
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+ZSTD_LEVEL = 3
+# Los contextos de zstandard no se pueden compartir entre hilos (add_files usa un pool)
+_zstd_local = threading.local()
+
+
+def _compressor():
+    """
+    Compresor zstd del hilo actual.
+    """
+    if not hasattr(_zstd_local, 'cctx'):
+        _zstd_local.cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _zstd_local.cctx
+
+
+def _compress(data: bytes) -> bytes:
+    """
+    Comprime con zstd si está disponible; si no, devuelve los datos tal cual.
+    """
+    return _compressor().compress(data) if zstandard is not None else data
+
+
+def _decompress(data: bytes) -> bytes:
+    """
+    Descomprime si los datos son un frame zstd; si no, los devuelve tal cual.
+    """
+    if zstandard is None or not data.startswith(ZSTD_MAGIC):
+        return data
+    try:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    except zstandard.ZstdError:
+        return data  # Contenido antiguo sin comprimir que empieza igual por casualidad
+
+# Sufijos reconocidos como archivo de commit (formato actual y el .json antiguo)
+COMMIT_SUFFIXES = (DATA_EXT, '.json')
+
+
+def _load_file(path: str) -> Any:
+    """
+    Lee y deserializa un archivo de datos según su extensión.
+    """
+    with open(path, 'rb') as f:
+        data = _decompress(f.read())
+    return orjson.loads(data) if path.endswith('.json') else _loads(data)
+
+
+def _read_data(path: str) -> Any:
+    """
+    Lee un archivo de datos. Si no existe en el formato actual,
+    prueba con la versión .json antigua (compatibilidad).
+    Lanza FileNotFoundError si no existe ninguno.
+    """
+    try:
+        return _load_file(path)
+    except FileNotFoundError:
+        legacy_path = os.path.splitext(path)[0] + '.json'
+        if legacy_path == path:
+            raise
+        return _load_file(legacy_path)
+
+
+def _write_data(path: str, obj: Any) -> None:
+    """
+    Serializa y guarda un objeto en el formato actual (sin indentación),
+    comprimido con zstd. Se escribe en un temporal y se renombra encima:
+    un lector nunca ve un frame zstd a medias.
+    """
+    data = _compress(_dumps(obj))
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+def _file_sha256(f) -> str:
+    """
+    sha256 de un archivo abierto en modo 'rb', leído por bloques.
+    Sin file_digest reutiliza un único buffer con readinto (sin un bytes nuevo por bloque).
+    """
+    if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+    sha = hashlib.sha256()
+    buf = bytearray(1024 * 1024)
+    view = memoryview(buf)
+    while (n := f.readinto(buf)):
+        sha.update(view[:n])
+    return sha.hexdigest()
+
+
+# Números de línea de la cabecera de un hunk: "@@ -a,b +c,d @@"
+_HUNK_RE = re.compile(r'([-+])(\d+)')
+
+
+def _unified_diff(prev: List[str], current: List[str], fromfile: str, tofile: str, n: int = 3):
+    """
+    Igual que difflib.unified_diff(..., lineterm=''), pero recorta antes el
+    prefijo y el sufijo comunes (dejando `n` líneas de contexto) para que el
+    motor de diff solo compare la zona que cambió.
+    """
+    lo = 0
+    max_lo = min(len(prev), len(current))
+    while lo < max_lo and prev[lo] == current[lo]:
+        lo += 1
+    hi = 0
+    max_hi = max_lo - lo
+    while hi < max_hi and prev[-1 - hi] == current[-1 - hi]:
+        hi += 1
+    start = max(0, lo - n)
+    tail = max(0, hi - n)
+    diff = difflib.unified_diff(
+        prev[start:len(prev) - tail],
+        current[start:len(current) - tail],
+        fromfile=fromfile,
+        tofile=tofile,
+        n=n,
+        lineterm=''
+    )
+    for line in diff:
+        if start and line.startswith('@@'):
+            # Volver a numerar respecto al archivo completo
+            line = _HUNK_RE.sub(lambda m: f"{m.group(1)}{int(m.group(2)) + start}", line)
+        yield line
+
+
+# Por debajo de este número de archivos no compensa crear el pool de hilos
+PARALLEL_ADD_MIN_FILES = 4
+
+# Listas del staging que en memoria se manejan como sets
+STAGING_SETS = ('added', 'modified', 'deleted')
+
+# Longitud máxima de una cadena de deltas (acota el coste de reconstruir un blob)
+MAX_DELTA_CHAIN = 16
+
+
+class BlobStore:
+    """
+    Almacén de contenidos direccionado por hash (como los objetos de Git).
+    Cada contenido se guarda una sola vez, comprimido con zstd, en
+    blobs/<2 primeros>/<resto del sha256>.
+    Las versiones sucesivas de un archivo pueden pasar a guardarse como delta
+    (bsdiff) contra la versión anterior en deltas/<hash>.bsdiff.
+    """
+    def __init__(self, root: str, deltas_root: Optional[str] = None):
+        self.root = root
+        self.deltas_root = deltas_root or os.path.join(os.path.dirname(root), 'deltas')
+        # Prefijos precalculados para construir rutas sin os.path.join
+        self._root_prefix = root + os.sep
+        self._deltas_prefix = self.deltas_root + os.sep
+        # Ordena la conversión blob completo → delta frente a las lecturas
+        self._lock = threading.Lock()
+
+    def path(self, content_hash: str) -> str:
+        """
+        Ruta del blob completo para un hash sha256 completo.
+        """
+        return self._root_prefix + content_hash[:2] + os.sep + content_hash[2:]
+
+    def delta_path(self, content_hash: str) -> str:
+        """
+        Ruta del delta de un blob. Contiene el hash base, un salto de línea y el parche.
+        """
+        return self._deltas_prefix + content_hash + '.bsdiff'
+
+    def base_marker_path(self, content_hash: str) -> str:
+        """
+        Marca de que algún delta usa este blob como base: ya no puede
+        pasar a guardarse como delta (alargaría las cadenas que dependen de él).
+        """
+        return self._deltas_prefix + content_hash + '.base'
+
+    def exists(self, content_hash: str) -> bool:
+        """
+        Indica si el contenido está guardado, completo o como delta.
+        """
+        return os.path.exists(self.path(content_hash)) or os.path.exists(self.delta_path(content_hash))
+
+    def put(self, data: bytes) -> str:
+        """
+        Guarda `data` si no existía ya y devuelve su hash sha256.
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        if os.path.exists(self.delta_path(content_hash)):
+            return content_hash  # Ya guardado como delta
+        blob_path = self.path(content_hash)
+        if os.path.exists(blob_path):
+            return content_hash  # Mismo contenido ya guardado por otro archivo o commit
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        self._publish(blob_path, lambda f: f.write(_compress(data)))
+        return content_hash
+
+    @staticmethod
+    def _publish(blob_path: str, write) -> None:
+        """
+        Escribe un blob con write(f) en un temporal y lo renombra a su ruta
+        final: nadie lee un blob a medias y un corte no deja uno truncado.
+        """
+        tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, blob_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def put_file(self, f) -> str:
+        """
+        Guarda el contenido de un archivo abierto en modo 'rb' sin cargarlo
+        entero en memoria y devuelve su hash sha256.
+        """
+        content_hash = _file_sha256(f)
+        if not self.exists(content_hash):
+            blob_path = self.path(content_hash)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            f.seek(0)
+
+            def write(out):
+                if zstandard is not None:
+                    _compressor().copy_stream(f, out)
+                else:
+                    shutil.copyfileobj(f, out, 1024 * 1024)
+            self._publish(blob_path, write)
+        return content_hash
+
+    def _read_delta(self, content_hash: str):
+        """
+        Devuelve (hash_base, parche) del delta de un blob.
+        """
+        with open(self.delta_path(content_hash), 'rb') as f:
+            base_hash, patch = f.read().split(b'\n', 1)
+        return base_hash.decode('ascii'), patch
+
+    def _delta_chain(self, content_hash: str) -> List[str]:
+        """
+        Hashes que hay que recorrer, desde `content_hash` hasta el primer blob completo.
+        """
+        chain = [content_hash]
+        while not os.path.exists(self.path(chain[-1])):
+            chain.append(self._read_delta(chain[-1])[0])
+            if len(chain) > MAX_DELTA_CHAIN + 1:
+                raise Exception(f"Cadena de deltas demasiado larga: {content_hash}")
+        return chain
+
+    def _read_full(self, content_hash: str) -> bytes:
+        """
+        Lee un blob guardado completo (descomprimiéndolo si hace falta).
+        """
+        with open(self.path(content_hash), 'rb') as f:
+            return _decompress(f.read())
+
+    def _read_chain(self, content_hash: str):
+        """
+        Lee de una vez el blob completo del final de la cadena y los parches
+        (del más cercano a la base al más lejano).
+        """
+        chain = self._delta_chain(content_hash)
+        return self._read_full(chain[-1]), [self._read_delta(h)[1] for h in reversed(chain[:-1])]
+
+    def get_bytes(self, content_hash: str) -> bytes:
+        """
+        Lee el contenido de un blob, aplicando los deltas necesarios.
+        """
+        with self._lock:
+            try:
+                data, patches = self._read_chain(content_hash)
+            except FileNotFoundError:
+                # Otro proceso convirtió un blob de la cadena en delta entre
+                # el recorrido y la lectura: la cadena nueva ya está completa
+                data, patches = self._read_chain(content_hash)
+        # Aplicar los parches (CPU) fuera del bloqueo
+        for patch in patches:
+            data = bsdiff4.patch(data, patch)
+        return data
+
+    def get_text(self, content_hash: str) -> str:
+        """
+        Lee el contenido de un blob como texto UTF-8.
+        """
+        return self.get_bytes(content_hash).decode('utf-8')
+
+    def store_delta(self, content_hash: str, base_hash: str) -> bool:
+        """
+        Convierte el blob completo `content_hash` en un delta contra `base_hash`
+        si bsdiff4 está disponible y el delta ocupa menos de la mitad.
+        Retorna True si se guardó como delta.
+        """
+        if bsdiff4 is None or content_hash == base_hash:
+            return False
+        blob_path = self.path(content_hash)
+        if not self._can_become_delta(content_hash, base_hash):
+            return False
+        new_data = self._read_full(content_hash)
+        patch = bsdiff4.diff(self.get_bytes(base_hash), new_data)
+        if len(patch) >= len(new_data) // 2:
+            return False
+        os.makedirs(self.deltas_root, exist_ok=True)
+        with self._lock:
+            # Volver a comprobar: otro hilo pudo convertir algún blob mientras se calculaba el parche
+            if not self._can_become_delta(content_hash, base_hash):
+                return False
+            # Marcar la base antes de que exista el delta que depende de ella
+            with open(self.base_marker_path(base_hash), 'ab'):
+                pass
+            delta_path = self.delta_path(content_hash)
+            tmp_path = f"{delta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(base_hash.encode('ascii') + b'\n' + patch)
+            os.replace(tmp_path, delta_path)
+            # El delta ya está completo: se puede quitar la copia entera
+            os.remove(blob_path)
+        return True
+
+    def _can_become_delta(self, content_hash: str, base_hash: str) -> bool:
+        """
+        Indica si el blob completo `content_hash` puede pasar a ser un delta
+        contra `base_hash` sin crear ciclos ni cadenas de más de MAX_DELTA_CHAIN.
+        """
+        if not os.path.exists(self.path(content_hash)) or not self.exists(base_hash):
+            return False
+        # Si otros deltas dependen de este blob, convertirlo alargaría sus cadenas
+        if os.path.exists(self.base_marker_path(content_hash)):
+            return False
+        base_chain = self._delta_chain(base_hash)
+        return content_hash not in base_chain and len(base_chain) < MAX_DELTA_CHAIN
+
+@dataclass(slots=True)
+class FileMeta:
     """
-    Representa un snapshot (captura) de un archivo en un momento dado.
-    Incluye nombre relativo, contenido, hash, tamaño y fecha de modificación.
+    Metadatos de un archivo en un momento dado: nombre relativo, hash, tamaño
+    y fecha de modificación. El contenido vive en el BlobStore bajo su hash.
     """
     name: str
-    content: str
     hash: str
     size: int
     modified: str
     
     @classmethod
-    def from_file(cls, file_path: str, base_path: str = ""):
+    def from_file(cls, file_path: str, base_path: str = "", blob_store: Optional[BlobStore] = None):
         """
-        Crea un snapshot a partir de un archivo físico.
-        Calcula hash, tamaño y fecha de modificación.
+        Crea los metadatos a partir de un archivo físico.
+        Calcula hash, tamaño y fecha de modificación; si se pasa un
+        blob_store, guarda también el contenido en él.
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()[:8]
-        stat = os.stat(file_path)
+        with open(file_path, 'rb') as f:
+            # El hash se calcula sobre los bytes, sin decodificar el texto
+            content_hash = blob_store.put_file(f) if blob_store else _file_sha256(f)
+            stat = os.fstat(f.fileno())
         relative_name = os.path.relpath(file_path, base_path) if base_path else os.path.basename(file_path)
         return cls(
             name=relative_name,
-            content=content,
             hash=content_hash,
             size=stat.st_size,
             modified=datetime.fromtimestamp(stat.st_mtime).isoformat()
         )
 
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convierte los metadatos a diccionario serializable
+        (escrito a mano: dataclasses.asdict hace una copia profunda recursiva).
+        """
+        return {
+            'name': self.name,
+            'hash': self.hash,
+            'size': self.size,
+            'modified': self.modified
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FileMeta':
+        """
+        Crea los metadatos desde un diccionario, ignorando el campo
+        'content' de los registros antiguos que lo guardaban en línea.
+        """
+        return cls(
+            name=data['name'],
+            hash=data['hash'],
+            size=data['size'],
+            modified=data['modified']
+        )
+
 @dataclass 
 class WebCommit:
     """
@@ -60,7 +461,7 @@ class WebCommit:
     message: str
     author: str
     timestamp: str
-    files: List[FileSnapshot]
+    files: List[FileMeta]
     parent: Optional[str] = None
     
     def __post_init__(self):
@@ -73,14 +474,14 @@ class WebCommit:
     
     def to_dict(self) -> Dict[str, Any]:
         """
-        Convierte el commit a diccionario serializable para JSON.
+        Convierte el commit a diccionario serializable (solo metadatos de archivos).
         """
         return {
             'hash': self.hash,
             'message': self.message,
             'author': self.author,
             'timestamp': self.timestamp,
-            'files': [asdict(f) for f in self.files],
+            'files': [f.to_dict() for f in self.files],
             'parent': self.parent
         }
     
@@ -89,7 +490,7 @@ class WebCommit:
         """
         Crea un WebCommit desde un diccionario (por ejemplo, leído de JSON).
         """
-        files = [FileSnapshot(**f) for f in data.get('files', [])]
+        files = [FileMeta.from_dict(f) for f in data.get('files', [])]
         return cls(
             hash=data['hash'],
             message=data['message'],
@@ -109,8 +510,137 @@ class WebRepository:
         self.minigit_dir = os.path.join(path, '.minigit')
         self.config_file = os.path.join(self.minigit_dir, 'config.json')
         self.commits_dir = os.path.join(self.minigit_dir, 'commits')
-        self.staging_file = os.path.join(self.minigit_dir, 'staging.json')
+        self.staging_file = os.path.join(self.minigit_dir, 'staging' + DATA_EXT)
         self.refs_dir = os.path.join(self.minigit_dir, 'refs')
+        # Rama actual y ruta de su referencia (se leen de config.json, por defecto main)
+        self._current_branch = 'main'
+        self._current_ref_path = os.path.join(self.refs_dir, 'main')
+        # Caché de config.json: (st_mtime_ns, datos parseados)
+        self._config_cache: Optional[tuple] = None
+        # Prefijos precalculados para construir rutas sin os.path.join
+        self._path_prefix = path + os.sep
+        self._commits_prefix = self.commits_dir + os.sep
+        # Caché de la referencia de la rama actual: (ruta, st_mtime_ns, hash)
+        self._head_cache: tuple = (None, None, None)
+        # Índice SQLite de commits (metadatos y archivos de cada commit)
+        self.index_file = os.path.join(self.minigit_dir, 'index.db')
+        # Una conexión por hilo: una conexión compartida mezcla las transacciones
+        # y los cursores de hilos distintos. init() sube la generación para
+        # que cada hilo reabra la suya.
+        self._db_local = threading.local()
+        self._db_generation = 0
+        # Generación cuyo esquema ya se creó (y cuyos commits antiguos se importaron)
+        self._db_schema_generation: Optional[int] = None
+        self._db_lock = threading.Lock()
+        self.blobs = BlobStore(os.path.join(self.minigit_dir, 'blobs'))
+        # Caché del staging: (st_mtime_ns, datos parseados)
+        self._staging_cache: Optional[tuple] = None
+
+    def _load_config(self) -> Dict[str, Any]:
+        """
+        Lee config.json (solo si cambió su mtime) y actualiza la rama actual
+        y la ruta de su referencia. Lanza FileNotFoundError si no existe.
+        """
+        mtime = os.stat(self.config_file).st_mtime_ns
+        if self._config_cache is None or self._config_cache[0] != mtime:
+            config = _load_file(self.config_file)
+            self._current_branch = config.get('current_branch', 'main')
+            self._current_ref_path = os.path.join(self.refs_dir, self._current_branch)
+            self._config_cache = (mtime, config)
+        return self._config_cache[1]
+
+    def _current_ref(self) -> str:
+        """
+        Ruta de la referencia de la rama actual.
+        """
+        try:
+            self._load_config()
+        except OSError:
+            pass  # Sin config: se mantiene la rama por defecto
+        return self._current_ref_path
+
+    def _commit_file(self, commit_hash: str) -> str:
+        """
+        Ruta del archivo de un commit en el formato actual.
+        """
+        return self._commits_prefix + commit_hash + DATA_EXT
+
+    def _snapshot_content(self, file_snap: Dict[str, Any]) -> str:
+        """
+        Contenido de un archivo registrado en un commit o en el staging.
+        Los registros antiguos lo llevan en línea; los nuevos se leen del blob.
+        """
+        if 'content' in file_snap:
+            return file_snap['content']
+        return self.blobs.get_text(file_snap['hash'])
+
+    def _meta_from_staged(self, entry: Dict[str, Any]) -> FileMeta:
+        """
+        Convierte una entrada del staging en FileMeta. Si es una entrada
+        antigua con el contenido en línea, lo pasa antes al BlobStore.
+        """
+        if 'content' in entry:
+            entry = dict(entry, hash=self.blobs.put(entry['content'].encode('utf-8')))
+        return FileMeta.from_dict(entry)
+
+    def _store_deltas(self, file_metas: List[FileMeta], parent_hash: Optional[str]) -> None:
+        """
+        Para cada archivo que cambió respecto al commit padre, intenta
+        guardar su blob como delta contra la versión anterior.
+        """
+        if bsdiff4 is None or not parent_hash:
+            return
+        parent_files = dict(self._get_db().execute(
+            'SELECT name, blob_hash FROM commit_files WHERE commit_hash = ?', (parent_hash,)
+        ))
+        for file_meta in file_metas:
+            base_hash = parent_files.get(file_meta.name)
+            if base_hash and base_hash != file_meta.hash:
+                try:
+                    self.blobs.store_delta(file_meta.hash, base_hash)
+                except Exception:
+                    pass  # Si falla, el blob se queda completo
+
+    @staticmethod
+    def _staging_from_disk(data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        En disco 'added', 'modified' y 'deleted' son listas; en memoria se
+        manejan como sets para que pertenencia y borrado sean O(1).
+        """
+        staging_data = dict(data)
+        for key in STAGING_SETS:
+            staging_data[key] = set(data.get(key, []))
+        return staging_data
+
+    def _load_staging(self) -> Dict[str, Any]:
+        """
+        Lee el staging actual; si no existe devuelve uno vacío.
+        Solo vuelve a parsear el archivo si cambió su mtime. Devuelve una
+        copia para que los cambios no lleguen a la caché sin guardarse.
+        """
+        try:
+            mtime = os.stat(self.staging_file).st_mtime_ns
+        except FileNotFoundError:
+            self._staging_cache = None
+            try:
+                # staging .json antiguo
+                return self._staging_from_disk(_read_data(self.staging_file))
+            except FileNotFoundError:
+                return {'files': {}, 'added': set(), 'modified': set(), 'deleted': set()}
+        if self._staging_cache is None or self._staging_cache[0] != mtime:
+            self._staging_cache = (mtime, self._staging_from_disk(_read_data(self.staging_file)))
+        return {key: value.copy() for key, value in self._staging_cache[1].items()}
+
+    def _save_staging(self, staging_data: Dict[str, Any]) -> None:
+        """
+        Guarda el staging (los sets como listas ordenadas, para una salida
+        determinista) y actualiza la caché con el nuevo mtime.
+        """
+        on_disk = dict(staging_data)
+        for key in STAGING_SETS:
+            on_disk[key] = sorted(staging_data.get(key, ()))
+        _write_data(self.staging_file, on_disk)
+        self._staging_cache = (os.stat(self.staging_file).st_mtime_ns, self._staging_from_disk(on_disk))
     
     def init(self) -> Dict[str, Any]:
         """
@@ -122,6 +652,9 @@ class WebRepository:
             os.makedirs(self.minigit_dir, exist_ok=True)
             os.makedirs(self.commits_dir, exist_ok=True)
             os.makedirs(self.refs_dir, exist_ok=True)
+            os.makedirs(self.blobs.root, exist_ok=True)
+            # Reabrir el índice por si la carpeta .minigit se ha recreado
+            self._db_generation += 1
             # Configuración inicial
             config = {
                 'initialized': True,
@@ -129,8 +662,8 @@ class WebRepository:
                 'created_at': datetime.now().isoformat(),
                 'version': '1.0.0'
             }
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=2)
+            with open(self.config_file, 'wb') as f:
+                f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
             # Staging inicial vacío
             staging = {
                 'files': {},
@@ -138,11 +671,9 @@ class WebRepository:
                 'modified': [],
                 'deleted': []
             }
-            with open(self.staging_file, 'w') as f:
-                json.dump(staging, f, indent=2)
-            # Referencia inicial a main
-            main_ref = os.path.join(self.refs_dir, 'main')
-            with open(main_ref, 'w') as f:
+            self._save_staging(staging)
+            # Referencia inicial de la rama actual (main)
+            with open(self._current_ref(), 'w') as f:
                 f.write('')  # Vacío hasta el primer commit
             return {
                 'success': True,
@@ -176,20 +707,16 @@ class WebRepository:
             }
         try:
             # Leer configuración
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
+            config = self._load_config()
             # Leer staging
-            staging_data = {}
-            if os.path.exists(self.staging_file):
-                with open(self.staging_file, 'r') as f:
-                    staging_data = json.load(f)
+            staging_data = self._load_staging()
             # Contar commits
             total_commits = 0
             if os.path.exists(self.commits_dir):
-                total_commits = len([f for f in os.listdir(self.commits_dir) if f.endswith('.json')])
+                total_commits = self._get_db().execute('SELECT COUNT(*) FROM commits').fetchone()[0]
             # Detectar archivos modificados en el directorio de trabajo
             working_files = self._scan_working_directory()
-            staged_files = staging_data.get('added', [])
+            staged_files = sorted(staging_data['added'])
             return {
                 'initialized': True,
                 'current_branch': config.get('current_branch', 'main'),
@@ -205,53 +732,79 @@ class WebRepository:
                 'error': str(e)
             }
     
+    def _iter_files(self):
+        """
+        Recorre el directorio de trabajo con os.scandir (DFS iterativo) y
+        genera las rutas relativas de los archivos. Poda .minigit por nombre.
+        """
+        stack = [self.path]
+        base = len(self.path) + 1
+        while stack:
+            current = stack.pop()
+            try:
+                entries = os.scandir(current)
+            except OSError:
+                continue  # Carpeta ilegible o borrada: se omite, como os.walk
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != '.minigit':
+                            stack.append(entry.path)
+                    else:
+                        yield entry.path[base:]
+
     def _scan_working_directory(self) -> List[str]:
         """
         Escanea el directorio de trabajo para encontrar archivos (excluye .minigit).
         """
-        files = []
         try:
-            for root, dirs, filenames in os.walk(self.path):
-                # Ignorar directorio .minigit
-                if '.minigit' in root:
-                    continue
-                for filename in filenames:
-                    file_path = os.path.join(root, filename)
-                    rel_path = os.path.relpath(file_path, self.path)
-                    files.append(rel_path)
+            return list(self._iter_files())
         except Exception:
-            pass
-        return files
+            return []
     
+    def _write_and_snapshot(self, file_data: Dict[str, str]) -> FileMeta:
+        """
+        Escribe un archivo en el directorio de trabajo y devuelve sus metadatos
+        (guardando también su contenido en el BlobStore). El hash se calcula
+        sobre los bytes ya en memoria, sin volver a leer el archivo.
+        """
+        file_path = self._path_prefix + file_data['name']
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        data = file_data['content'].encode('utf-8')
+        with open(file_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            stat = os.fstat(f.fileno())
+        return FileMeta(
+            name=os.path.relpath(file_path, self.path),
+            hash=self.blobs.put(data),
+            size=len(data),
+            modified=datetime.fromtimestamp(stat.st_mtime).isoformat()
+        )
+
     def add_files(self, files: List[Dict[str, str]]) -> Dict[str, Any]:
         """
         Añade archivos al área de staging y los guarda físicamente en el repo.
+        Con varios archivos, la escritura y el hash se reparten en un pool de hilos.
         """
         try:
             # Leer staging actual
-            staging_data = {'files': {}, 'added': [], 'modified': [], 'deleted': []}
-            if os.path.exists(self.staging_file):
-                with open(self.staging_file, 'r') as f:
-                    staging_data = json.load(f)
-            added_files = []
-            for file_data in files:
+            staging_data = self._load_staging()
+            added_files = [file_data['name'] for file_data in files]
+            # Si un nombre se repite gana la última versión, como al escribir en orden
+            latest = list({file_data['name']: file_data for file_data in files}.values())
+            if len(latest) < PARALLEL_ADD_MIN_FILES:
+                metas = [self._write_and_snapshot(file_data) for file_data in latest]
+            else:
+                with ThreadPoolExecutor(max_workers=min(32, len(latest))) as pool:
+                    metas = list(pool.map(self._write_and_snapshot, latest))
+            for file_data, file_meta in zip(latest, metas):
                 file_name = file_data['name']
-                file_content = file_data['content']
-                # Crear archivo en el directorio de trabajo
-                file_path = os.path.join(self.path, file_name)
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(file_content)
-                # Crear snapshot del archivo
-                file_snapshot = FileSnapshot.from_file(file_path, self.path)
                 # Añadir al staging
-                staging_data['files'][file_name] = asdict(file_snapshot)
-                if file_name not in staging_data['added']:
-                    staging_data['added'].append(file_name)
-                added_files.append(file_name)
+                staging_data['files'][file_name] = file_meta.to_dict()
+                staging_data['added'].add(file_name)
             # Guardar staging actualizado
-            with open(self.staging_file, 'w') as f:
-                json.dump(staging_data, f, indent=2)
+            self._save_staging(staging_data)
             return {
                 'success': True,
                 'message': f'Archivos añadidos al staging: {", ".join(added_files)}',
@@ -271,20 +824,19 @@ class WebRepository:
             if not self.is_initialized():
                 return {'success': False, 'message': 'Repositorio no inicializado'}
             # Leer staging
-            if not os.path.exists(self.staging_file):
-                return {'success': False, 'message': 'No hay archivos en staging'}
-            with open(self.staging_file, 'r') as f:
-                staging_data = json.load(f)
-            staged_files = staging_data.get('added', [])
+            staging_data = self._load_staging()
+            staged_files = sorted(staging_data['added'])
             if not staged_files:
                 return {'success': False, 'message': 'No hay archivos para hacer commit'}
             # Crear snapshots de archivos
             file_snapshots = []
             for file_name in staged_files:
                 if file_name in staging_data['files']:
-                    file_snapshots.append(FileSnapshot(**staging_data['files'][file_name]))
+                    file_snapshots.append(self._meta_from_staged(staging_data['files'][file_name]))
             # Obtener commit padre
             parent_hash = self._get_last_commit_hash()
+            # Guardar como delta las versiones nuevas de archivos que ya estaban en el padre
+            self._store_deltas(file_snapshots, parent_hash)
             # Crear commit
             commit = WebCommit(
                 hash="",  # Se generará automáticamente
@@ -294,18 +846,18 @@ class WebRepository:
                 files=file_snapshots,
                 parent=parent_hash
             )
-            # Guardar commit
-            commit_file = os.path.join(self.commits_dir, f'{commit.hash}.json')
-            with open(commit_file, 'w') as f:
-                json.dump(commit.to_dict(), f, indent=2)
+            # Guardar commit y registrarlo en el índice
+            commit_dict = commit.to_dict()
+            _write_data(self._commit_file(commit.hash), commit_dict)
+            self._index_commits(self._get_db(), [commit_dict])
             # Actualizar referencia de branch
-            branch_ref = os.path.join(self.refs_dir, 'main')
-            with open(branch_ref, 'w') as f:
+            ref_path = self._current_ref()
+            with open(ref_path, 'w') as f:
                 f.write(commit.hash)
+            self._head_cache = (ref_path, os.stat(ref_path).st_mtime_ns, commit.hash)
             # Limpiar staging
             staging_data = {'files': {}, 'added': [], 'modified': [], 'deleted': []}
-            with open(self.staging_file, 'w') as f:
-                json.dump(staging_data, f, indent=2)
+            self._save_staging(staging_data)
             return {
                 'success': True,
                 'message': 'Commit creado exitosamente',
@@ -320,60 +872,142 @@ class WebRepository:
     
     def _get_last_commit_hash(self) -> Optional[str]:
         """
-        Devuelve el hash del último commit de la rama principal.
+        Devuelve el hash del último commit de la rama actual.
+        Solo relee la referencia si cambió su mtime.
         """
+        ref_path = self._current_ref()
         try:
-            main_ref = os.path.join(self.refs_dir, 'main')
-            if os.path.exists(main_ref):
-                with open(main_ref, 'r') as f:
-                    hash_value = f.read().strip()
-                    return hash_value if hash_value else None
+            mtime = os.stat(ref_path).st_mtime_ns
+        except OSError:
             return None
+        if (ref_path, mtime) == self._head_cache[:2]:
+            return self._head_cache[2]
+        try:
+            with open(ref_path, 'r') as f:
+                hash_value = f.read().strip() or None
         except Exception:
             return None
+        self._head_cache = (ref_path, mtime, hash_value)
+        return hash_value
     
+    def _get_db(self) -> sqlite3.Connection:
+        """
+        Devuelve la conexión al índice SQLite del hilo actual, abriéndola la
+        primera vez. La primera conexión crea el esquema y, si el índice está
+        vacío pero hay archivos de commit (repos anteriores al índice), los importa.
+        """
+        local = self._db_local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            if local.generation == self._db_generation:
+                return conn
+            conn.close()
+            local.conn = None
+        generation = self._db_generation
+        # timeout: espera a que termine la transacción de otra conexión en vez de fallar
+        conn = sqlite3.connect(self.index_file, isolation_level=None, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._db_lock:
+            if self._db_schema_generation != generation:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript('''
+                    CREATE TABLE IF NOT EXISTS commits (
+                        hash TEXT PRIMARY KEY, message TEXT, author TEXT,
+                        timestamp TEXT, parent TEXT, files_count INTEGER);
+                    CREATE INDEX IF NOT EXISTS commits_timestamp ON commits (timestamp);
+                    CREATE TABLE IF NOT EXISTS commit_files (
+                        commit_hash TEXT, name TEXT, blob_hash TEXT, size INTEGER);
+                    CREATE INDEX IF NOT EXISTS commit_files_commit ON commit_files (commit_hash);
+                ''')
+                if conn.execute('SELECT COUNT(*) FROM commits').fetchone()[0] == 0:
+                    self._index_commits(conn, self._read_commit_files())
+                self._db_schema_generation = generation
+        local.conn = conn
+        local.generation = generation
+        return conn
+
+    def _read_commit_files(self) -> List[Dict[str, Any]]:
+        """
+        Lee todos los archivos de commit (formato actual y .json antiguos).
+        """
+        commits = []
+        if os.path.exists(self.commits_dir):
+            with os.scandir(self.commits_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(COMMIT_SUFFIXES):
+                        commits.append(_load_file(entry.path))
+        return commits
+
+    @staticmethod
+    def _index_commits(conn: sqlite3.Connection, commits: List[Dict[str, Any]]) -> None:
+        """
+        Inserta commits en el índice en una sola transacción.
+        """
+        if not commits:
+            return
+        # IMMEDIATE: toma el bloqueo de escritura al empezar (sin esperas a mitad de transacción)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for data in commits:
+                files = data.get('files', [])
+                conn.execute(
+                    'INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?)',
+                    (data['hash'], data['message'], data['author'], data['timestamp'],
+                     data.get('parent'), len(files))
+                )
+                conn.execute('DELETE FROM commit_files WHERE commit_hash = ?', (data['hash'],))
+                conn.executemany(
+                    'INSERT INTO commit_files VALUES (?, ?, ?, ?)',
+                    [(data['hash'], f['name'], f['hash'], f.get('size')) for f in files]
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _iter_commit_history(self):
+        """
+        Genera el historial de commits (más reciente primero) a medida que
+        SQLite recorre el índice por timestamp; quien consume puede parar
+        en cuanto tenga suficientes sin que se lean los demás.
+        """
+        if not os.path.exists(self.commits_dir):
+            return
+        rows = self._get_db().execute(
+            'SELECT hash, message, author, timestamp, files_count, parent '
+            'FROM commits ORDER BY timestamp DESC'
+        )
+        for row in rows:
+            yield {
+                'hash': row[0],
+                'message': row[1],
+                'author': row[2],
+                'timestamp': row[3],
+                'files_count': row[4],
+                'parent': row[5]
+            }
+
     def get_commit_history(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Devuelve el historial de commits ordenado por fecha (más reciente primero).
         """
         try:
-            if not os.path.exists(self.commits_dir):
-                return []
-            commits = []
-            commit_files = [f for f in os.listdir(self.commits_dir) if f.endswith('.json')]
-            # Leer todos los commits
-            commit_data = []
-            for commit_file in commit_files:
-                commit_path = os.path.join(self.commits_dir, commit_file)
-                with open(commit_path, 'r') as f:
-                    data = json.load(f)
-                    commit_data.append(data)
-            # Ordenar por timestamp (más reciente primero)
-            commit_data.sort(key=lambda x: x['timestamp'], reverse=True)
-            # Formatear para la web
-            for data in commit_data[:limit]:
-                commits.append({
-                    'hash': data['hash'],
-                    'message': data['message'],
-                    'author': data['author'],
-                    'timestamp': data['timestamp'],
-                    'files_count': len(data.get('files', [])),
-                    'parent': data.get('parent')
-                })
-            return commits
+            return list(islice(self._iter_commit_history(), limit))
         except Exception as e:
             return []
     
-    def get_commit_details(self, commit_hash: str) -> Optional[Dict[str, Any]]:
+    def get_commit_details(self, commit_hash: str, include_content: bool = True) -> Optional[Dict[str, Any]]:
         """
-        Devuelve los detalles completos de un commit dado su hash.
+        Devuelve los detalles completos de un commit dado su hash,
+        incluido el contenido de cada archivo (leído de los blobs).
+        Con include_content=False solo devuelve metadatos y no lee ningún blob.
         """
         try:
-            commit_file = os.path.join(self.commits_dir, f'{commit_hash}.json')
-            if not os.path.exists(commit_file):
-                return None
-            with open(commit_file, 'r') as f:
-                return json.load(f)
+            commit_data = _read_data(self._commit_file(commit_hash))
+            if include_content:
+                for file_snap in commit_data.get('files', []):
+                    file_snap['content'] = self._snapshot_content(file_snap)
+            return commit_data
         except Exception:
             return None
     
@@ -382,7 +1016,7 @@ class WebRepository:
         Devuelve el contenido de un archivo del working directory.
         """
         try:
-            full_path = os.path.join(self.path, file_path)
+            full_path = self._path_prefix + file_path
             if not os.path.exists(full_path):
                 return None
             with open(full_path, 'r', encoding='utf-8') as f:
@@ -399,31 +1033,42 @@ class WebRepository:
         Devuelve el diff unificado entre el archivo actual y la última versión commiteada.
         """
         try:
-            # Leer contenido actual
-            full_path = os.path.join(self.path, file_path)
+            full_path = self._path_prefix + file_path
             if not os.path.exists(full_path):
                 return { 'success': False, 'error': 'Archivo no existe en el directorio de trabajo' }
-            with open(full_path, 'r', encoding='utf-8') as f:
-                current_content = f.readlines()
             # Buscar último commit que contenga este archivo
             last_commit_hash = self._get_last_commit_hash()
-            prev_content = []
+            prev_snap = None
             if last_commit_hash:
-                commit_file = os.path.join(self.commits_dir, f'{last_commit_hash}.json')
-                if os.path.exists(commit_file):
-                    with open(commit_file, 'r', encoding='utf-8') as f:
-                        commit_data = json.load(f)
+                try:
+                    commit_data = _read_data(self._commit_file(last_commit_hash))
+                except FileNotFoundError:
+                    commit_data = None
+                if commit_data is not None:
                     for file_snap in commit_data.get('files', []):
                         if file_snap['name'] == file_path:
-                            prev_content = file_snap['content'].splitlines(keepends=True)
+                            prev_snap = file_snap
                             break
-            # Calcular diff unificado siempre
-            diff = difflib.unified_diff(
+            if prev_snap is not None:
+                # Mismo hash que en el commit: no hay cambios, no hace falta diff
+                # (startswith cubre los hashes cortos de commits antiguos)
+                with open(full_path, 'rb') as f:
+                    current_hash = _file_sha256(f)
+                if current_hash.startswith(prev_snap['hash']):
+                    return { 'success': True, 'diff': '' }
+            # Leer contenido actual en una sola lectura; newline='' conserva los
+            # finales de línea tal cual, igual que el blob (guardado en bytes)
+            with open(full_path, 'r', encoding='utf-8', newline='') as f:
+                current_content = f.read().splitlines(keepends=True)
+            prev_content = []
+            if prev_snap is not None:
+                prev_content = self._snapshot_content(prev_snap).splitlines(keepends=True)
+            # Calcular diff unificado
+            diff = _unified_diff(
                 prev_content,
                 current_content,
                 fromfile=f'{file_path} (commit)',
-                tofile=f'{file_path} (actual)',
-                lineterm=''
+                tofile=f'{file_path} (actual)'
             )
             diff_text = '\n'.join(diff)
             return { 'success': True, 'diff': diff_text }
@@ -436,23 +1081,17 @@ class WebRepository:
         """
         try:
             # Leer staging actual
-            staging_data = {'files': {}, 'added': [], 'modified': [], 'deleted': []}
-            if os.path.exists(self.staging_file):
-                with open(self.staging_file, 'r') as f:
-                    staging_data = json.load(f)
+            staging_data = self._load_staging()
             # Verificar que el archivo existe
-            abs_path = os.path.join(self.path, file_path)
+            abs_path = self._path_prefix + file_path
             if not os.path.exists(abs_path):
                 return {'success': False, 'error': 'Archivo no encontrado'}
-            # Crear snapshot
-            from dataclasses import asdict
-            file_snapshot = FileSnapshot.from_file(abs_path, self.path)
-            staging_data['files'][file_path] = asdict(file_snapshot)
-            if file_path not in staging_data['added']:
-                staging_data['added'].append(file_path)
+            # Guardar blob y metadatos
+            file_meta = FileMeta.from_file(abs_path, self.path, self.blobs)
+            staging_data['files'][file_path] = file_meta.to_dict()
+            staging_data['added'].add(file_path)
             # Guardar staging actualizado
-            with open(self.staging_file, 'w') as f:
-                json.dump(staging_data, f, indent=2)
+            self._save_staging(staging_data)
             return {'success': True, 'message': f"Archivo '{file_path}' añadido al staging"}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -463,18 +1102,13 @@ class WebRepository:
         """
         try:
             # Leer staging actual
-            staging_data = {'files': {}, 'added': [], 'modified': [], 'deleted': []}
-            if os.path.exists(self.staging_file):
-                with open(self.staging_file, 'r') as f:
-                    staging_data = json.load(f)
+            staging_data = self._load_staging()
             # Quitar del staging
             if file_path in staging_data['files']:
                 del staging_data['files'][file_path]
-            if file_path in staging_data['added']:
-                staging_data['added'].remove(file_path)
+            staging_data['added'].discard(file_path)
             # Guardar staging actualizado
-            with open(self.staging_file, 'w') as f:
-                json.dump(staging_data, f, indent=2)
+            self._save_staging(staging_data)
             return {'success': True, 'message': f"Archivo '{file_path}' removido del staging"}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -1,13 +1,224 @@
 import os
 import json
+import logging
 import hashlib
 import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 # This file is part of a simple version control system implementation.
 #from core.repository import Repository  
 # Importamos la clase Repository para interactuar con el repositorio
 
+log = logging.getLogger(__name__)
+
+try:
+    import orjson  # Opcional: serialización canónica directa a bytes
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl  # Solo POSIX: necesario para el ioctl FICLONE
+except ImportError:
+    fcntl = None
+
+try:
+    import blake3  # Opcional: hash con SIMD y varios hilos
+except ImportError:
+    blake3 = None
+
+# Algoritmos admitidos para los IDs de objetos y commits. Cada repositorio
+# guarda el suyo en config.json ("hash") al crearse; los repos anteriores no
+# lo tienen y son SHA-1 (hashlib lo acelera con SHA-NI vía OpenSSL si la CPU lo tiene)
+HASH_BACKENDS = ("sha1", "blake3")
+
+# Algoritmo pedido con MYGIT_HASH para los repos nuevos. En un repo existente
+# solo se acepta si coincide con el guardado (ver Repository.hash_backend)
+HASH_BACKEND = os.environ.get("MYGIT_HASH") or "sha1"
+
+# Longitud en hexadecimal de los IDs de objetos y commits (con cualquier HASH_BACKEND)
+HEX_LEN = 40
+
+# A partir de este tamaño BLAKE3 reparte el cálculo entre varios hilos
+BLAKE3_THREADS_THRESHOLD = 1024 * 1024
+
+# ioctl de Linux que clona un archivo compartiendo bloques (reflink CoW)
+FICLONE = 0x40049409
+
+# Por debajo de este tamaño se copia con una lectura y una escritura
+SMALL_FILE_SIZE = 64 * 1024
+
+# Máximo de hilos para hashear/copiar archivos en paralelo
+MAX_FILE_WORKERS = 8
+
+
+def check_hash_backend(backend):
+    """
+    Comprueba que un algoritmo de hash es conocido y está instalado.
+
+    Args:
+        backend (str): Nombre del algoritmo (uno de HASH_BACKENDS)
+
+    Raises:
+        Exception: Si no se puede usar
+    """
+    if backend not in HASH_BACKENDS:
+        raise Exception(f"Algoritmo de hash desconocido: {backend}")
+    if backend == "blake3" and blake3 is None:
+        raise Exception("El repositorio usa BLAKE3 pero el paquete blake3 no está instalado")
+
+
+def digest_bytes(data, backend="sha1"):
+    """
+    Calcula el ID de un contenido con el algoritmo indicado.
+
+    BLAKE3 se trunca a HEX_LEN // 2 bytes: los IDs siguen teniendo HEX_LEN
+    caracteres hexadecimales, igual que con SHA-1.
+
+    Args:
+        data (bytes o memoryview): Contenido a hashear
+        backend (str): Algoritmo del repositorio (Repository.hash_backend)
+
+    Returns:
+        str: Hash en hexadecimal (HEX_LEN caracteres)
+    """
+    if backend == "blake3":
+        threads = blake3.blake3.AUTO if len(data) > BLAKE3_THREADS_THRESHOLD else 1
+        return blake3.blake3(data, max_threads=threads).hexdigest(length=HEX_LEN // 2)
+    return hashlib.sha1(data).hexdigest()
+
+
+def map_files(func, items):
+    """
+    Aplica func a cada elemento, en paralelo con hilos si hay 2 o más.
+
+    La lectura de archivos, hashlib y shutil.copy2 liberan el GIL, así que
+    los hilos solapan el trabajo de I/O de distintos archivos. Cada hilo
+    recibe una sola tarea con un subconjunto intercalado de elementos: con
+    muchos archivos pequeños el costo de crear un Future por archivo
+    superaría al del propio hash.
+
+    Args:
+        func: Función a aplicar a cada elemento
+        items (list): Elementos a procesar
+
+    Returns:
+        list: Resultados en el mismo orden que items
+    """
+    if len(items) < 2:
+        return [func(item) for item in items]
+    workers = min(MAX_FILE_WORKERS, len(items))
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        # Intercalar (0, n, 2n...) reparte mejor los archivos grandes entre hilos
+        chunks = ex.map(lambda start: [func(item) for item in items[start::workers]],
+                        range(workers))
+        for start, chunk_results in enumerate(chunks):
+            results[start::workers] = chunk_results
+    return results
+
+
+def timestamp_ns(value):
+    """
+    Normaliza el timestamp de un commit a nanosegundos UNIX (int).
+
+    Los commits nuevos ya guardan time.time_ns(); los antiguos guardaban un
+    string ISO 8601 (core) o segundos float (MiniGit).
+
+    Args:
+        value (int, float o str): Timestamp guardado en el commit
+
+    Returns:
+        int: Nanosegundos desde la época UNIX
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        dt = datetime.fromisoformat(value)
+        return int(dt.timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+    return int(value * 1_000_000_000)
+
+
+def format_timestamp(value):
+    """
+    Formatea el timestamp de un commit como fecha local legible.
+
+    Args:
+        value (int, float o str): Timestamp guardado en el commit
+
+    Returns:
+        str: Fecha con formato 'YYYY-MM-DD HH:MM:SS'
+    """
+    return time.strftime('%Y-%m-%d %H:%M:%S',
+                         time.localtime(timestamp_ns(value) / 1_000_000_000))
+
+
+def _sendfile(src_fd, dst_fd, count):
+    """os.sendfile con la misma firma que os.copy_file_range (usa el offset actual)"""
+    return os.sendfile(dst_fd, src_fd, None, count)
+
+
+def clone_file(src, dst):
+    """
+    Copia src en dst moviendo la menor cantidad de bytes posible.
+
+    Los archivos pequeños se copian con un solo read y un solo write. Para
+    el resto intenta, en orden:
+    1. Reflink (FICLONE): Btrfs/XFS comparten los bloques copy-on-write.
+    2. os.copy_file_range: copia dentro del kernel, sin pasar por Python.
+    3. os.sendfile: copia sin pasar por Python en kernels sin copy_file_range
+       entre estos sistemas de archivos.
+    4. Copia por bloques con shutil.copyfileobj como último recurso.
+
+    No se usan hard links: el objeto compartiría inode con el archivo de
+    trabajo y una edición en el lugar corrompería el contenido guardado.
+
+    Una copia fallida puede dejar dst a medias: dst debe ser un temporal
+    que quien llama publica con os.replace cuando la copia termina bien.
+
+    Args:
+        src (str): Archivo original
+        dst (str): Archivo destino (temporal)
+
+    Raises:
+        FileExistsError: Si dst ya existe
+    """
+    # 'xb' = O_CREAT | O_EXCL: comprobar existencia y crear en una sola llamada
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        if size < SMALL_FILE_SIZE:
+            # Menos syscalls que intentar reflink/copy_file_range
+            fdst.write(fsrc.read())
+            return
+        if sys.platform.startswith("linux"):
+            if fcntl is not None:
+                try:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                    return
+                except OSError:
+                    pass
+            for copy in (getattr(os, "copy_file_range", None), _sendfile):
+                if copy is None:
+                    continue
+                try:
+                    remaining = size
+                    while remaining > 0:
+                        copied = copy(fsrc.fileno(), fdst.fileno(), remaining)
+                        if copied == 0:
+                            break
+                        remaining -= copied
+                    if remaining == 0:
+                        return
+                except OSError:
+                    pass
+                # Descartar una copia parcial antes del siguiente intento
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+
 
 class Commit:
     
@@ -68,24 +279,30 @@ class Commit:
         # 3. PROCESAR cada archivo del staging
         commit_files = {}  # Diccionario: {"archivo.py": "hash_contenido"}
         
+        full_paths = []
+        repo_root = str(self.repo.path)
         for file_path in staged_files:
-            print(f"🔄 Procesando: {file_path}")
+            # Detalle por archivo solo en DEBUG: un print por archivo domina con miles
+            log.debug("Procesando: %s", file_path)
             
-            # Verificar que el archivo existe
-            full_path = self.repo.path / file_path
-            if not full_path.exists():
+            # Verificar que el archivo existe (rutas como str: sin objetos Path por archivo)
+            full_path = os.path.join(repo_root, file_path)
+            if not os.path.exists(full_path):
                 raise Exception(f"Archivo no encontrado: {file_path}")
-            
-            # Calcular hash del contenido del archivo
-            content_hash = self.repo.calculate_file_hash(full_path)
-            
-            # Guardar el contenido del archivo en /objects
-            self._save_file_to_objects(full_path, content_hash)
-            
+            full_paths.append(full_path)
+        
+        # Hashear y guardar en /objects en paralelo: cada hilo encadena hash ->
+        # compresión -> escritura de su archivo, así el disco de un archivo se
+        # solapa con el cálculo de otro en lugar de esperar a que terminen todos
+        # los hashes. Con contenido repetido, write_blob no vuelve a escribirlo
+        hashes = map_files(self._hash_and_store, full_paths)
+        self.repo.save_hash_cache()
+        
+        for file_path, content_hash in zip(staged_files, hashes):
             # Agregar al diccionario del commit
             commit_files[file_path] = content_hash
             
-            print(f"✅ {file_path} -> {content_hash[:8]}...")
+            log.debug("%s -> %s", file_path, content_hash[:8])
         
         # 4. CREAR el objeto commit
         commit_data = self._create_commit_object(message, commit_files)
@@ -126,7 +343,7 @@ class Commit:
         commit_data = {
             "id": None,  # Se calculará después
             "message": message,
-            "timestamp": datetime.now().isoformat(),  # Fecha/hora actual
+            "timestamp": time.time_ns(),  # Fecha/hora actual (ns UNIX)
             "parent": last_commit,  # Commit del que viene (puede ser None)
             "files": files,  # Diccionario de archivos y sus hashes
             "author": "user"  # Por ahora hardcodeado (opcional: mejorar después)
@@ -148,19 +365,39 @@ class Commit:
             commit_data (dict): Datos del commit
             
         Returns:  
-            str: Hash SHA-1 del commit
+            str: Hash SHA-1 del commit (o BLAKE3, según el algoritmo del repositorio)
         """
-        # Crear string con toda la información del commit
+        # Serializar toda la información del commit en bytes canónicos
         # (sin incluir el ID que aún no existe)
-        commit_string = f"{commit_data['message']}" \
-                       f"{commit_data['timestamp']}" \
-                       f"{commit_data['parent']}" \
-                       f"{json.dumps(commit_data['files'], sort_keys=True)}"
-        
-        # Calcular SHA-1 del string completo
-        sha1 = hashlib.sha1()
-        sha1.update(commit_string.encode('utf-8'))
-        return sha1.hexdigest()
+        payload = {
+            "m": commit_data["message"],
+            "t": commit_data["timestamp"],
+            "p": commit_data["parent"],
+            "f": commit_data["files"],
+        }
+        if orjson is not None:
+            data = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        else:
+            # Misma salida que orjson: claves ordenadas, sin espacios, UTF-8
+            data = json.dumps(payload, sort_keys=True, separators=(",", ":"),
+                              ensure_ascii=False).encode("utf-8")
+        
+        # Calcular el hash directamente sobre los bytes
+        return digest_bytes(data, self.repo.hash_backend)
+    
+    def _hash_and_store(self, file_path):
+        """
+        Calcula el hash de un archivo y lo guarda en objects/.
+        
+        Args:
+            file_path (str): Ruta al archivo original
+            
+        Returns:
+            str: Hash del contenido
+        """
+        content_hash = self.repo.calculate_file_hash(file_path)
+        self._save_file_to_objects(file_path, content_hash)
+        return content_hash
     
     def _save_file_to_objects(self, file_path, content_hash):
         """
@@ -170,41 +407,28 @@ class Commit:
         tienen el mismo contenido, solo se guarda una copia.
         
         Args:
-            file_path (Path): Ruta al archivo original
+            file_path (str): Ruta al archivo original
             content_hash (str): Hash del contenido
         """
-        # Ruta donde guardar el archivo en objects/
-        object_file = self.repo.objects_path / content_hash
-        
-        # Si ya existe un archivo con ese hash, no lo duplicamos
-        if object_file.exists():
-            print(f"📋 Contenido ya existe: {content_hash[:8]}...")
-            return
-        
-        # Copiar el archivo original a objects/ con nombre = hash
+        # objects/ab/cdef... comprimido con zlib; si ya existe un objeto
+        # con ese hash, no lo duplicamos
         try:
-            shutil.copy2(file_path, object_file)
-            print(f"💾 Guardado en objects: {content_hash[:8]}...")
+            self.repo.write_blob(file_path, content_hash)
+            log.debug("Guardado en objects: %s", content_hash[:8])
         except Exception as e:
             raise Exception(f"Error al guardar {file_path}: {e}")
     
     def _add_commit_to_history(self, commit_data):
         """
-        Agrega el commit al historial (archivo commits.json).
+        Agrega el commit al historial (log commits.ndjson).
         
         Args:
             commit_data (dict): Datos completos del commit
         """
-        # Obtener historial actual
-        commits = self.repo.get_commits()
-        
-        # Agregar nuevo commit al final de la lista
-        commits.append(commit_data)
+        # Agregar al final del historial (el repositorio mantiene su caché)
+        total = self.repo.append_commit(commit_data)
         
-        # Guardar historial actualizado
-        self.repo._save_json(self.repo.commits_file, commits)
-        
-        print(f"📚 Commit agregado al historial (total: {len(commits)})")
+        print(f"📚 Commit agregado al historial (total: {total})")
     
     def _update_last_commit(self, commit_hash):
         """
@@ -234,7 +458,7 @@ class Commit:
             "timestamp": None
         }
         
-        self.repo._save_json(self.repo.staging_file, staging_data)
+        self.repo.set_staging(staging_data)
         print("🧹 Staging area limpiada")
     
     def _get_last_commit_id(self):
@@ -244,8 +468,7 @@ class Commit:
         Returns:
             str or None: Hash del último commit, o None si es el primer commit
         """
-        config = self.repo.get_config()
-        return config.get("last_commit")
+        return self.repo.get_head()
     
     def get_commit_by_id(self, commit_id):
         """
@@ -257,14 +480,8 @@ class Commit:
         Returns:
             dict or None: Datos del commit si se encuentra
         """
-        commits = self.repo.get_commits()
-        
-        # Buscar en la lista de commits
-        for commit in commits:
-            if commit["id"] == commit_id:
-                return commit
-        
-        return None
+        # Búsqueda O(1) en el índice id -> commit del repositorio
+        return self.repo.get_commit_by_id(commit_id)
     
     def get_history(self, limit=None):
         """
@@ -276,18 +493,23 @@ class Commit:
         Returns:
             list: Lista de commits ordenados del más reciente al más antiguo
         """
-        commits = self.repo.get_commits()
-        
-        # Ordenar por timestamp (más reciente primero)
-        sorted_commits = sorted(commits, 
-                               key=lambda x: x["timestamp"], 
-                               reverse=True)
-        
-        # Aplicar límite si se especifica
+        # Con límite: el repositorio puede resolverlo con el commit-graph
+        # sin parsear todo el historial
         if limit:
-            sorted_commits = sorted_commits[:limit]
+            return self.repo.get_recent_commits(limit)
         
-        return sorted_commits
+        # Vista ya ordenada por timestamp: solo hay que recorrerla al revés
+        return self.repo.get_commits_by_time()[::-1]
+    
+    def write_graph(self):
+        """
+        Reconstruye el commit-graph del repositorio (p. ej. en repos creados
+        antes de que existiera o si quedó desactualizado).
+        
+        Returns:
+            bool: True si se escribió
+        """
+        return self.repo.write_commit_graph()
     
     def show_log(self, limit=5):
         """
@@ -308,7 +530,7 @@ class Commit:
         for commit in commits:
             print(f"🆔 Commit: {commit['id']}")
             print(f"📝 Mensaje: {commit['message']}")  
-            print(f"📅 Fecha: {commit['timestamp']}")
+            print(f"📅 Fecha: {format_timestamp(commit['timestamp'])}")
             print(f"👤 Autor: {commit.get('author', 'unknown')}")
             
             if commit['parent']:
@@ -3,18 +3,49 @@
 Mini-Git: Un sistema de control de versiones simplificado
 Uso: python minigit.py <comando> [argumentos]
 """
-import base64
+import os
 import sys
-import argparse
 import hashlib
 import json
+import logging
+import threading
 import time
 from pathlib import Path
 from typing import Dict, List, Optional
-# Importar clases del core
-from core.repository import Repository
-from core.commit import Commit
+# Las utilidades de core.repository / core.commit se importan dentro de los
+# métodos que las usan: 'init' o 'status' no pagan su tiempo de importación
 
+log = logging.getLogger(__name__)
+
+try:
+    import orjson  # Opcional: parseo/serialización JSON en C
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(obj) -> bytes:
+    """Serializa a JSON indentado en bytes UTF-8 (orjson si está disponible)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+
+def _json_line(obj) -> bytes:
+    """Serializa a una sola línea JSON terminada en salto de línea"""
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return json.dumps(obj).encode('utf-8') + b"\n"
+
+
+# Tamaño de bloque al leer commits.ndjson desde el final
+LOG_TAIL_CHUNK = 64 * 1024
+
+
+def _json_loads(data: bytes):
+    """Parsea JSON desde bytes (orjson si está disponible)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 class MiniGit:
@@ -22,10 +53,14 @@ class MiniGit:
         self.repo_path = Path(repo_path).resolve()
         self.git_dir = self.repo_path / ".minigit"
         self.objects_dir = self.git_dir / "objects"
+        self._objects_prefix = str(self.objects_dir) + os.sep
         self.refs_dir = self.git_dir / "refs"
         self.heads_dir = self.refs_dir / "heads"
         self.index_file = self.git_dir / "index"
         self.head_file = self.git_dir / "HEAD"
+        # Log de commits (un JSON por línea) para leer el historial sin abrir cada objeto
+        self.commits_log = self.git_dir / "commits.ndjson"
+        self._log_cache = (None, {})
         
     def init(self) -> bool:
         """Inicializa un nuevo repositorio"""
@@ -41,7 +76,7 @@ class MiniGit:
             self.heads_dir.mkdir()
             
             # Crear archivos iniciales
-            self.index_file.write_text("[]")
+            self._save_index(self._empty_index())
             self.head_file.write_text("ref: refs/heads/main")
             
             print(f"✅ Repositorio inicializado en {self.git_dir}")
@@ -58,33 +93,137 @@ class MiniGit:
             return False
         return True
     
-    def _hash_content(self, content: str) -> str:
+    def _hash_content(self, data: bytes) -> str:
         """Genera hash SHA-1 del contenido"""
-        return hashlib.sha1(content.encode()).hexdigest()
+        return hashlib.sha1(data).hexdigest()
     
-    def _save_object(self, content: str) -> str:
-        """Guarda un objeto y retorna su hash"""
-        hash_obj = self._hash_content(content)
-        obj_path = self.objects_dir / hash_obj
-        obj_path.write_text(content)
+    def _hash_file(self, path: str) -> str:
+        """
+        Genera hash SHA-1 del contenido binario de un archivo sin cargarlo entero.
+        Siempre SHA-1, igual que _hash_content (MYGIT_HASH solo afecta a core.repository).
+        """
+        with open(path, 'rb', buffering=0) as f:
+            from core.repository import file_sha1
+            return file_sha1(f, "sha1")
+    
+    def _try_hash_file(self, path: str) -> Optional[str]:
+        """Como _hash_file, pero retorna None si el archivo no se puede leer"""
+        try:
+            return self._hash_file(path)
+        except OSError:
+            return None
+    
+    def _try_save_file(self, item) -> bool:
+        """
+        Guarda el contenido de (hash, ruta) como objeto; False si no se puede
+        leer o si cambió desde que se calculó su hash.
+        """
+        hash_obj, path = item
+        shard_dir = self._objects_prefix + hash_obj[:2]
+        obj_path = shard_dir + os.sep + hash_obj[2:]
+        if os.path.exists(obj_path):
+            return True  # Se publica con os.replace: si existe, está completo
+        tmp_path = f"{obj_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                os.mkdir(shard_dir)
+            except FileExistsError:
+                pass
+            # Copia en el kernel a un temporal; se comprueba que sigue siendo
+            # el contenido hasheado y solo entonces se publica con el nombre final
+            from core.commit import clone_file
+            from core.repository import file_sha1
+            clone_file(path, tmp_path)
+            with open(tmp_path, 'rb', buffering=0) as f:
+                if file_sha1(f, "sha1") != hash_obj:
+                    raise OSError(f"{path} cambió mientras se guardaba")
+            os.replace(tmp_path, obj_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
+    
+    def _object_path(self, hash_obj: str) -> Path:
+        """Ruta de un objeto repartida por prefijo como en Git: objects/ab/cdef..."""
+        return self.objects_dir / hash_obj[:2] / hash_obj[2:]
+    
+    def _save_object(self, data: bytes, hash_obj: Optional[str] = None) -> str:
+        """Guarda un objeto binario y retorna su hash (calculado si no se indica)"""
+        if hash_obj is None:
+            hash_obj = self._hash_content(data)
+        shard_dir = self._objects_prefix + hash_obj[:2]
+        try:
+            os.mkdir(shard_dir)
+        except FileExistsError:
+            pass
+        # Temporal + os.replace: un corte a mitad de escritura no deja un objeto
+        # truncado con el nombre final (y reescribirlo repara uno dañado)
+        obj_path = shard_dir + os.sep + hash_obj[2:]
+        tmp_path = f"{obj_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, obj_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
         return hash_obj
     
-    def _load_object(self, hash_obj: str) -> Optional[str]:
-        """Carga un objeto por su hash"""
-        obj_path = self.objects_dir / hash_obj
-        if obj_path.exists():
-            return obj_path.read_text()
+    def _load_object(self, hash_obj: str) -> Optional[bytes]:
+        """Carga un objeto por su hash (bytes tal cual se guardaron)"""
+        for obj_path in (self._object_path(hash_obj),
+                         self.objects_dir / hash_obj):  # formato plano antiguo
+            if obj_path.is_file():
+                return obj_path.read_bytes()
         return None
     
-    def _load_index(self) -> List[Dict]:
-        """Carga el índice (staging area)"""
-        if self.index_file.exists():
-            return json.loads(self.index_file.read_text())
-        return []
+    def _resolve_hash(self, partial: str) -> str:
+        """Completa un hash parcial buscando solo en la subcarpeta de su prefijo"""
+        if len(partial) >= 2:
+            rest = partial[2:]
+            try:
+                with os.scandir(self.objects_dir / partial[:2]) as entries:
+                    # next(): se detiene en la primera coincidencia
+                    found = next((e.name for e in entries
+                                  if e.name.startswith(rest) and not e.name.endswith('.tmp')), None)
+            except (FileNotFoundError, NotADirectoryError):
+                found = None
+            if found:
+                return partial[:2] + found
+        # Repos antiguos guardaban los objetos directamente en objects/
+        with os.scandir(self.objects_dir) as entries:
+            found = next((e.name for e in entries
+                          if e.name.startswith(partial) and e.is_file()), None)
+        return found or partial
+    
+    @staticmethod
+    def _empty_index() -> Dict[str, List]:
+        """Índice vacío: una lista por columna (paths, hashes, timestamps)"""
+        return {'paths': [], 'hashes': [], 'timestamps': []}
+    
+    def _load_index(self) -> Dict[str, List]:
+        """Carga el índice (staging area) en columnas: {'paths', 'hashes', 'timestamps'}"""
+        if not self.index_file.exists():
+            return self._empty_index()
+        data = _json_loads(self.index_file.read_bytes())
+        if isinstance(data, list):
+            # Formato antiguo: lista de entradas {path, hash, timestamp}
+            return {
+                'paths': [item['path'] for item in data],
+                'hashes': [item['hash'] for item in data],
+                'timestamps': [item['timestamp'] for item in data],
+            }
+        return data
     
-    def _save_index(self, index: List[Dict]):
-        """Guarda el índice"""
-        self.index_file.write_text(json.dumps(index, indent=2))
+    def _save_index(self, index: Dict[str, List]):
+        """Guarda el índice en columnas"""
+        self.index_file.write_bytes(_json_dumps(index))
     
     def add(self, files: List[str]) -> bool:
         """Añade archivos al staging area (soporta binarios y texto)"""
@@ -93,46 +232,63 @@ class MiniGit:
         
         index = self._load_index()
         added_files = []
+        candidates = []  # (argumento original, ruta absoluta, ruta relativa)
+        repo_root = str(self.repo_path).rstrip(os.sep) + os.sep
         
         for file_path in files:
-            path = Path(file_path).resolve()
-            print(f"DEBUG: path={path}, repo_path={self.repo_path}")
+            path = os.path.abspath(file_path)
+            log.debug("path=%s, repo_path=%s", path, self.repo_path)
             
-            if not path.exists():
+            if not os.path.exists(path):
                 print(f"❌ Archivo no encontrado: {file_path}")
                 continue
                 
-            if not path.is_file():
+            if not os.path.isfile(path):
                 print(f"❌ No es un archivo: {file_path}")
                 continue
             
-            # Leer contenido del archivo en binario y codificar en base64
-            try:
-                content_bytes = path.read_bytes()
-                content_b64 = base64.b64encode(content_bytes).decode('ascii')
-            except Exception:
-                print(f"❌ No se puede leer {file_path}")
-                continue
-            
-            # Guardar como objeto
-            hash_obj = self._save_object(content_b64)
+            # Comprobación por prefijo, sin excepciones ni resolve() por componente;
+            # solo si no coincide se resuelven symlinks (p. ej. /tmp -> /private/tmp)
+            if not path.startswith(repo_root):
+                path = os.path.realpath(path)
+                if not path.startswith(repo_root):
+                    print(f"❌ El archivo {file_path} debe estar dentro del repositorio ({self.repo_path})")
+                    continue
+            rel_path = path[len(repo_root):].replace("\\", "/")
             
-            # Actualizar índice
-            try:
-                rel_path = str(path.relative_to(self.repo_path)).replace("\\", "/")
-            except ValueError:
-                print(f"❌ El archivo {file_path} debe estar dentro del repositorio ({self.repo_path})")
+            candidates.append((file_path, path, rel_path))
+        
+        # Hashear todos los archivos en paralelo
+        from core.commit import map_files
+        hashes = map_files(self._try_hash_file, [path for _, path, _ in candidates])
+        
+        # Guardar el contenido binario tal cual, como los blobs de Git
+        # (una sola escritura por contenido nuevo, también en paralelo)
+        to_save = {}
+        for (_, path, _), hash_obj in zip(candidates, hashes):
+            if hash_obj:
+                to_save.setdefault(hash_obj, path)
+        saved = dict(zip(to_save, map_files(self._try_save_file, list(to_save.items()))))
+        
+        # Un solo timestamp para todo el lote
+        now = time.time_ns()
+        index_paths, index_hashes, index_times = index['paths'], index['hashes'], index['timestamps']
+        positions = {path: i for i, path in enumerate(index_paths)}
+        for (file_path, path, rel_path), hash_obj in zip(candidates, hashes):
+            if not hash_obj or not saved.get(hash_obj, True):
+                print(f"❌ No se puede leer {file_path}")
                 continue
             
-            # Remover entrada existente si existe
-            index = [item for item in index if item['path'] != rel_path]
-            
-            # Añadir nueva entrada
-            index.append({
-                'path': rel_path,
-                'hash': hash_obj,
-                'timestamp': time.time()
-            })
+            # Añadir o reemplazar la entrada existente en O(1)
+            pos = positions.get(rel_path)
+            if pos is None:
+                positions[rel_path] = len(index_paths)
+                index_paths.append(rel_path)
+                index_hashes.append(hash_obj)
+                index_times.append(now)
+            else:
+                index_hashes[pos] = hash_obj
+                index_times[pos] = now
             
             added_files.append(rel_path)
         
@@ -162,11 +318,10 @@ class MiniGit:
                 print(f"🔍 HEAD detached: {head_ref[:8]}")
         
         # Mostrar archivos en staging
-        index = self._load_index()
-        if index:
-            print(f"\n📦 Archivos en staging ({len(index)}):")
-            for item in index:
-                print(f"   ✅ {item['path']}")
+        staged_paths = self._load_index()['paths']
+        if staged_paths:
+            print(f"\n📦 Archivos en staging ({len(staged_paths)}):")
+            print("\n".join(f"   ✅ {path}" for path in staged_paths))
         else:
             print("\n📦 No hay archivos en staging")
         
@@ -179,21 +334,27 @@ class MiniGit:
             return False
             
         index = self._load_index()
-        if not index:
+        if not index['paths']:
             print("❌ No hay cambios para commitear. Usa 'minigit add' primero.")
             return False
         
         # Crear objeto commit
         commit_data = {
             'message': message,
-            'timestamp': time.time(),
-            'files': index,
+            'timestamp': time.time_ns(),
+            # Los commits mantienen una entrada por archivo (compatible con log/show)
+            'files': [{'path': p, 'hash': h, 'timestamp': t}
+                      for p, h, t in zip(index['paths'], index['hashes'], index['timestamps'])],
             'parent': self._get_current_commit()
         }
         
-        commit_json = json.dumps(commit_data, indent=2)
+        commit_json = _json_dumps(commit_data)
         commit_hash = self._save_object(commit_json)
         
+        # Registrar también en el log, con una sola escritura al final
+        with open(self.commits_log, 'ab') as f:
+            f.write(_json_line({'hash': commit_hash, **commit_data}))
+        
         # Actualizar referencia del branch
         head_ref = self.head_file.read_text().strip()
         if head_ref.startswith("ref: "):
@@ -202,11 +363,11 @@ class MiniGit:
             branch_path.write_text(commit_hash)
         
         # Limpiar staging area
-        self._save_index([])
+        self._save_index(self._empty_index())
         
         print(f"✅ Commit creado: {commit_hash[:8]}")
         print(f"📝 Mensaje: {message}")
-        print(f"📊 Archivos: {len(index)}")
+        print(f"📊 Archivos: {len(index['paths'])}")
         
         return True
     
@@ -225,6 +386,48 @@ class MiniGit:
         
         return None
     
+    def _read_log_tail(self, limit: int) -> Dict[str, Dict]:
+        """Lee los últimos `limit` commits de commits.ndjson recorriéndolo desde el final"""
+        try:
+            st = self.commits_log.stat()
+        except FileNotFoundError:
+            return {}
+        key = (st.st_mtime_ns, st.st_size, limit)
+        if self._log_cache[0] == key:
+            return self._log_cache[1]
+        
+        with open(self.commits_log, 'rb') as f:
+            pos = f.seek(0, 2)
+            data = b""
+            while pos > 0 and data.count(b"\n") <= limit:
+                step = min(LOG_TAIL_CHUNK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        
+        lines = data.splitlines()
+        if pos > 0:
+            lines = lines[1:]  # La primera línea puede estar cortada
+        commits = {}
+        for line in lines[-limit:]:
+            try:
+                commit = _json_loads(line)
+            except ValueError:
+                continue  # Línea incompleta de una escritura en curso
+            commits[commit['hash']] = commit
+        self._log_cache = (key, commits)
+        return commits
+    
+    def _load_commit(self, commit_hash: str, recent: Dict[str, Dict]) -> Optional[Dict]:
+        """Obtiene un commit del log ya leído o, si no está, de su objeto"""
+        commit = recent.get(commit_hash)
+        if commit is not None:
+            return commit
+        commit_data = self._load_object(commit_hash)
+        if not commit_data:
+            return None
+        return _json_loads(commit_data)
+    
     def log(self, limit: int = 10):
         """Muestra el historial de commits"""
         if not self._check_repo():
@@ -238,31 +441,35 @@ class MiniGit:
         print("📚 Historial de commits:")
         print("=" * 50)
         
+        from core.commit import format_timestamp
+        
+        # Los últimos commits salen de una lectura del log; los que no estén
+        # (repos anteriores al log) se cargan desde su objeto
+        recent = self._read_log_tail(limit)
+        
         count = 0
         while current_hash and count < limit:
-            commit_data = self._load_object(current_hash)
-            if not commit_data:
-                break
-                
             try:
-                commit = json.loads(commit_data)
-                timestamp = time.strftime('%Y-%m-%d %H:%M:%S', 
-                                        time.localtime(commit['timestamp']))
+                commit = self._load_commit(current_hash, recent)
+                if commit is None:
+                    break
+                timestamp = format_timestamp(commit['timestamp'])
                 
                 print(f"🔸 Commit: {current_hash[:8]}")
                 print(f"📅 Fecha: {timestamp}")
                 print(f"💬 Mensaje: {commit['message']}")
                 print(f"📊 Archivos: {len(commit['files'])}")
                 
-                for file_info in commit['files']:
-                    print(f"   📄 {file_info['path']}")
+                # Una sola escritura para toda la lista de archivos
+                if commit['files']:
+                    print("\n".join(f"   📄 {file_info['path']}" for file_info in commit['files']))
                 
                 print("-" * 30)
                 
                 current_hash = commit.get('parent')
                 count += 1
                 
-            except json.JSONDecodeError:
+            except (json.JSONDecodeError, UnicodeDecodeError):
                 break
     
     def show(self, commit_hash: Optional[str] = None):
@@ -279,10 +486,7 @@ class MiniGit:
         
         # Buscar hash completo si se dio hash parcial
         if len(commit_hash) < 40:
-            for obj_file in self.objects_dir.iterdir():
-                if obj_file.name.startswith(commit_hash):
-                    commit_hash = obj_file.name
-                    break
+            commit_hash = self._resolve_hash(commit_hash)
         
         commit_data = self._load_object(commit_hash)
         if not commit_data:
@@ -290,9 +494,9 @@ class MiniGit:
             return
         
         try:
-            commit = json.loads(commit_data)
-            timestamp = time.strftime('%Y-%m-%d %H:%M:%S', 
-                                    time.localtime(commit['timestamp']))
+            from core.commit import format_timestamp
+            commit = _json_loads(commit_data)
+            timestamp = format_timestamp(commit['timestamp'])
             
             if commit_hash:
                 print(f"🔍 Detalles del commit: {commit_hash[:8]}")
@@ -307,22 +511,31 @@ class MiniGit:
                 print(f"👆 Commit padre: {commit['parent'][:8]}")
             
             print("\n📁 Archivos en este commit:")
-            for file_info in commit['files']:
-                print(f"   📄 {file_info['path']} ({file_info['hash'][:8]})")
+            if commit['files']:
+                print("\n".join(f"   📄 {file_info['path']} ({file_info['hash'][:8]})"
+                                for file_info in commit['files']))
                 
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, UnicodeDecodeError):
             print("❌ Error al leer el commit")
 
-class MiniGitCLI:
-    def __init__(self):
-        self.git = MiniGit()
+# Subcomandos sin argumentos: se despachan sin construir el parser
+SIMPLE_COMMANDS = ('init', 'status')
+
+_parser = None
+
+
+def _get_parser():
+    """Construye (una sola vez) el parser de argumentos del CLI"""
+    global _parser
+    if _parser is not None:
+        return _parser
     
-    def run(self):
-        """Punto de entrada principal del CLI"""
-        parser = argparse.ArgumentParser(
-            description="Mini-Git: Sistema de control de versiones simplificado",
-            formatter_class=argparse.RawDescriptionHelpFormatter,
-            epilog="""
+    import argparse  # Solo hace falta cuando hay argumentos que parsear
+    
+    parser = argparse.ArgumentParser(
+        description="Mini-Git: Sistema de control de versiones simplificado",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
 Comandos disponibles:
   init                 Inicializa un nuevo repositorio
   add <archivos...>    Añade archivos al staging area
@@ -338,58 +551,72 @@ Ejemplos:
   python minigit.py status
   python minigit.py log
   python minigit.py show abc123
-            """
-        )
-        
-        subparsers = parser.add_subparsers(dest='command', help='Comandos disponibles')
-        
-        # Comando init
-        subparsers.add_parser('init', help='Inicializa un nuevo repositorio')
-        
-        # Comando add
-        add_parser = subparsers.add_parser('add', help='Añade archivos al staging area')
-        add_parser.add_argument('files', nargs='+', help='Archivos a añadir')
-        
-        # Comando commit
-        commit_parser = subparsers.add_parser('commit', help='Crea un commit')
-        commit_parser.add_argument('-m', '--message', required=True, 
-                                 help='Mensaje del commit')
-        
-        # Comando status
-        subparsers.add_parser('status', help='Muestra el estado del repositorio')
-        
-        # Comando log
-        log_parser = subparsers.add_parser('log', help='Muestra el historial')
-        log_parser.add_argument('-n', '--limit', type=int, default=10,
-                              help='Número máximo de commits a mostrar')
-        
-        # Comando show
-        show_parser = subparsers.add_parser('show', help='Muestra detalles de un commit')
-        show_parser.add_argument('hash', nargs='?', help='Hash del commit (opcional)')
-        
-        # Parsear argumentos
+        """
+    )
+    
+    subparsers = parser.add_subparsers(dest='command', help='Comandos disponibles')
+    
+    # Comando init
+    subparsers.add_parser('init', help='Inicializa un nuevo repositorio')
+    
+    # Comando add
+    add_parser = subparsers.add_parser('add', help='Añade archivos al staging area')
+    add_parser.add_argument('files', nargs='+', help='Archivos a añadir')
+    
+    # Comando commit
+    commit_parser = subparsers.add_parser('commit', help='Crea un commit')
+    commit_parser.add_argument('-m', '--message', required=True, 
+                             help='Mensaje del commit')
+    
+    # Comando status
+    subparsers.add_parser('status', help='Muestra el estado del repositorio')
+    
+    # Comando log
+    log_parser = subparsers.add_parser('log', help='Muestra el historial')
+    log_parser.add_argument('-n', '--limit', type=int, default=10,
+                          help='Número máximo de commits a mostrar')
+    
+    # Comando show
+    show_parser = subparsers.add_parser('show', help='Muestra detalles de un commit')
+    show_parser.add_argument('hash', nargs='?', help='Hash del commit (opcional)')
+    
+    _parser = parser
+    return parser
+
+
+class MiniGitCLI:
+    def __init__(self):
+        self.git = MiniGit()
+    
+    def run(self):
+        """Punto de entrada principal del CLI"""
         if len(sys.argv) == 1:
-            parser.print_help()
+            _get_parser().print_help()
             return
-
-        args = parser.parse_args()
+        
+        # Atajo: 'init' y 'status' no llevan argumentos
+        if len(sys.argv) == 2 and sys.argv[1] in SIMPLE_COMMANDS:
+            command, args = sys.argv[1], None
+        else:
+            args = _get_parser().parse_args()
+            command = args.command
         
         # Ejecutar comando
         try:
-            if args.command == 'init':
+            if command == 'init':
                 self.git.init()
-            elif args.command == 'add':
+            elif command == 'add':
                 self.git.add(args.files)
-            elif args.command == 'commit':
+            elif command == 'commit':
                 self.git.commit(args.message)
-            elif args.command == 'status':
+            elif command == 'status':
                 self.git.status()
-            elif args.command == 'log':
+            elif command == 'log':
                 self.git.log(args.limit)
-            elif args.command == 'show':
+            elif command == 'show':
                 self.git.show(args.hash)
             else:
-                parser.print_help()
+                _get_parser().print_help()
         except KeyboardInterrupt:
             print("\n\n👋 ¡Hasta luego!")
         except Exception as e:
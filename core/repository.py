@@ -1,11 +1,112 @@
 import os
 import json
+import atexit
+import mmap
+import bisect
+import struct
+import functools
 import hashlib
+import time
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 # core.commit  
 # Asegúrate de que este módulo existe y contiene la clase Commit
-from core.commit import Commit
+from core.commit import (Commit, timestamp_ns, format_timestamp, map_files, digest_bytes,
+                         check_hash_backend, HASH_BACKEND, SMALL_FILE_SIZE)
+
+try:
+    import orjson  # Opcional: serializa directamente a bytes desde C
+except ImportError:
+    orjson = None
+
+try:
+    # Opcional: zlib-ng comprime con SIMD y genera el mismo formato que zlib
+    from zlib_ng import zlib_ng as zlib
+except ImportError:
+    import zlib
+
+# A partir de este tamaño el hash se calcula sobre un mmap del archivo:
+# se evita copiar cada bloque del page cache a un buffer de usuario
+MMAP_HASH_THRESHOLD = 8 * 1024 * 1024
+
+# Tamaño del buffer reutilizado al hashear sin hashlib.file_digest
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# commit-graph: cabecera (firma, bytes de commits.ndjson cubiertos) y un
+# registro fijo por commit (id, padre, timestamp ns, offset de su línea en el log)
+COMMIT_GRAPH_MAGIC = b"MGGRAPH1"
+COMMIT_GRAPH_HEADER = struct.Struct("<8sQ")
+COMMIT_GRAPH_RECORD = struct.Struct("<20s20sqQ")
+
+# Nivel de zlib para los blobs: casi la misma compresión que 6 en código
+# fuente, con bastante menos CPU
+BLOB_COMPRESSION_LEVEL = 1
+
+# Buffer de escritura de los JSON del repositorio (el de Python es de 8 KiB)
+JSON_WRITE_BUFFER = 1024 * 1024
+
+# Archivos modificados hace menos de esto no se guardan en la caché de hashes:
+# otra escritura dentro de la resolución del mtime no cambiaría la clave
+HASH_CACHE_MIN_AGE_NS = 2 * 1_000_000_000
+
+
+def file_sha1(f, backend="sha1"):
+    """
+    Calcula el hash SHA-1 de un archivo ya abierto en modo binario.
+
+    Los archivos de más de MMAP_HASH_THRESHOLD se hashean sobre un mmap
+    (sin copias a memoria de usuario). El resto usa hashlib.file_digest
+    (Python 3.11+), que hace todo el bucle de lectura en C, o un único
+    buffer reutilizado con readinto en versiones anteriores.
+
+    Con otro algoritmo (backend distinto de "sha1") el archivo se hashea
+    entero sobre un mmap con digest_bytes.
+
+    Args:
+        f: Archivo abierto con open(ruta, 'rb', buffering=0)
+        backend (str): Algoritmo del repositorio
+
+    Returns:
+        str: Hash SHA-1 en hexadecimal
+    """
+    size = os.fstat(f.fileno()).st_size
+    if backend != "sha1":
+        if not size:
+            return digest_bytes(b"", backend)  # mmap no admite archivos vacíos
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return digest_bytes(view, backend)
+
+    if size > MMAP_HASH_THRESHOLD:
+        # Archivos grandes: el kernel hace el readahead sin
+        # copiar el contenido a buffers de Python
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return hashlib.sha1(view).hexdigest()
+
+    if hasattr(hashlib, "file_digest"):  # Python 3.11+
+        return hashlib.file_digest(f, "sha1").hexdigest()
+
+    sha1 = hashlib.sha1()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while (n := f.readinto(buffer)):
+        sha1.update(view[:n])
+    return sha1.hexdigest()
+
+
+def requires_repo(method):
+    """
+    Decorador: exige que la carpeta sea un repositorio válido antes de
+    ejecutar el método. Con el resultado de is_repository() memorizado,
+    la comprobación es una lectura de atributo.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.is_repository():
+            raise Exception("No es un repositorio válido. Ejecuta 'init' primero.")
+        return method(self, *args, **kwargs)
+    return wrapper
 
 
 class Repository:
@@ -22,13 +123,62 @@ class Repository:
             path (str): Ruta donde está el repositorio (por defecto carpeta actual)
         """
         self.path = Path(path).resolve()  # Ruta absoluta del proyecto
+        self._path_str = str(self.path)  # Ya resuelta: no hace falta resolverla otra vez
         self.mygit_path = self.path / ".mygit"  # Carpeta .mygit
         self.objects_path = self.mygit_path / "objects"  # Carpeta objects
+        self._objects_prefix = str(self.objects_path) + os.sep
+        # Objetos que ya sabemos que existen (los objetos nunca se borran):
+        # evita el stat de write_blob al volver a guardar el mismo contenido
+        self._known_objects = set()
         
         # Archivos de configuración
         self.config_file = self.mygit_path / "config.json"
         self.staging_file = self.mygit_path / "staging.json" 
         self.commits_file = self.mygit_path / "commits.json"
+        # Resultado de is_repository(): solo se recuerda cuando es True
+        self._is_repo = None
+        # Algoritmo de hash del repositorio (config.json), leído bajo demanda
+        self._hash_backend = None
+        # Caché de hashes: ruta -> [mtime_ns, tamaño, hash]
+        # (una por algoritmo: un hash SHA-1 guardado no sirve con BLAKE3;
+        # hash_backend la cambia a hashcache-<algoritmo>.json si hace falta)
+        self.hash_cache_file = self.mygit_path / "hashcache.json"
+        self._hash_cache = None
+        self._hash_cache_dirty = False
+        # Staging en memoria: se relee solo si cambia el mtime de staging.json
+        # y dentro de staging_batch() se escribe una sola vez al final
+        self._staging = None
+        self._staging_set = set()  # Mismos archivos que _staging["files"], para búsquedas O(1)
+        self._staging_mtime = None
+        self._staging_dirty = False
+        self._staging_batch_depth = 0
+        self._index_locked = False
+        # Log de commits nuevos: un JSON por línea, solo se agrega al final
+        self.commits_log = self.mygit_path / "commits.ndjson"
+        # Índice binario del log para leer los últimos commits sin parsear todo
+        self.commit_graph = self.mygit_path / "commit-graph"
+        # ((mtime_ns, tamaño) de commits.json, si tiene commits antiguos):
+        # el commit-graph solo cubre commits.ndjson
+        self._legacy_commits_state = None
+        # Las mismas rutas como str para las llamadas de I/O frecuentes:
+        # open()/os.stat() no tienen que convertir un Path en cada llamada
+        self._config_file_str = str(self.config_file)
+        self._staging_file_str = str(self.staging_file)
+        self._commits_file_str = str(self.commits_file)
+        self._commits_log_str = str(self.commits_log)
+        self._commit_graph_str = str(self.commit_graph)
+        self._hash_cache_file_str = str(self.hash_cache_file)
+        self._index_lock_str = str(self.mygit_path / "index.lock")
+        
+        # Caché del historial: commits.json se relee si cambia su mtime y del
+        # log solo se leen los bytes agregados desde la última lectura
+        self._commits_cache = None
+        self._commits_mtime = None
+        self._commits_log_offset = 0
+        self._commits_by_id = {}
+        # Vista ordenada por timestamp (ascendente), construida bajo demanda
+        self._commits_sorted = None
+        self._commits_timestamps = None
     
     def init(self):
         """
@@ -40,6 +190,9 @@ class Repository:
             print(f"Ya existe un repositorio en {self.path}")
             return False
         
+        # El algoritmo de hash queda fijado para siempre al crear el repo
+        check_hash_backend(HASH_BACKEND)
+        
         # Crear carpeta .mygit y subcarpetas
         self.mygit_path.mkdir(exist_ok=True)
         self.objects_path.mkdir(exist_ok=True)
@@ -48,35 +201,89 @@ class Repository:
         config_data = {
             "name": self.path.name,
             "created": datetime.now().isoformat(),
-            "last_commit": None
+            "last_commit": None,
+            "hash": HASH_BACKEND
         }
-        self._save_json(self.config_file, config_data)
+        self._save_json(self._config_file_str, config_data)
         
         # Crear archivo de staging vacío
         staging_data = {
             "files": [],
             "timestamp": None
         }
-        self._save_json(self.staging_file, staging_data)
+        self._save_json(self._staging_file_str, staging_data)
+        # Por si el proceso termina dentro de un lote sin llegar a flush()
+        atexit.register(self.flush)
         
         # Crear archivo de commits vacío
-        self._save_json(self.commits_file, [])
+        self._save_json(self._commits_file_str, [])
+        # commit-graph vacío: append_commit lo mantiene al día
+        with open(self._commit_graph_str, "wb") as f:
+            f.write(COMMIT_GRAPH_HEADER.pack(COMMIT_GRAPH_MAGIC, 0))
         
+        self._is_repo = True
         print(f"Repositorio inicializado en {self.path}")
         return True
     
+    @property
+    def hash_backend(self):
+        """
+        Algoritmo de los IDs de este repositorio, guardado en config.json al
+        crearlo (los repos sin la clave "hash" son SHA-1). Fuera de un
+        repositorio se usa el pedido con MYGIT_HASH.
+        
+        Raises:
+            Exception: Si MYGIT_HASH pide otro algoritmo o el del repo no está instalado
+        """
+        if self._hash_backend is not None:
+            return self._hash_backend
+        if not self.is_repository():
+            check_hash_backend(HASH_BACKEND)
+            return HASH_BACKEND
+        backend = self.get_config().get("hash", "sha1")
+        requested = os.environ.get("MYGIT_HASH")
+        if requested and requested != backend:
+            raise Exception(f"El repositorio usa {backend} y MYGIT_HASH pide {requested}: "
+                            "los IDs se mezclarían en el historial")
+        check_hash_backend(backend)
+        if backend != "sha1":
+            self.hash_cache_file = self.mygit_path / f"hashcache-{backend}.json"
+            self._hash_cache_file_str = str(self.hash_cache_file)
+        self._hash_backend = backend
+        return backend
+    
     def is_repository(self):
         """
         Verifica si la carpeta actual es un repositorio válido.
         
+        Los archivos requeridos se buscan con una sola lectura de .mygit
+        (os.scandir) en lugar de un stat por archivo. Un resultado positivo
+        se recuerda: los métodos públicos lo consultan en cada llamada.
+        
         Returns:
             bool: True si es un repositorio, False si no
         """
-        return (self.mygit_path.exists() and 
-                self.config_file.exists() and
-                self.staging_file.exists() and
-                self.commits_file.exists())
+        if self._is_repo:
+            return True
+        required = {self.config_file.name, self.staging_file.name, self.commits_file.name}
+        try:
+            with os.scandir(self.mygit_path) as it:
+                for entry in it:
+                    required.discard(entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        if required:
+            return False
+        self._is_repo = True
+        return True
+    
+    def invalidate_repo_cache(self):
+        """
+        Olvida el resultado de is_repository() (p. ej. si se borró .mygit).
+        """
+        self._is_repo = None
     
+    @requires_repo
     def get_config(self):
         """
         Obtiene la configuración del repositorio.
@@ -84,23 +291,144 @@ class Repository:
         Returns:
             dict: Configuración del repositorio
         """
-        if not self.is_repository():
-            raise Exception("No es un repositorio válido. Ejecuta 'init' primero.")
-        
-        return self._load_json(self.config_file)
+        return self._load_json(self._config_file_str)
     
+    @requires_repo
     def get_staging(self):
         """
         Obtiene los archivos en el área de staging.
         
+        El contenido se guarda en memoria: staging.json solo se vuelve a
+        parsear si otro proceso lo modificó (cambia su mtime o tamaño).
+        
         Returns:
-            dict: Archivos en staging
+            dict: Archivos en staging (modificar solo a través de set_staging)
         """
-        if not self.is_repository():
-            raise Exception("No es un repositorio válido. Ejecuta 'init' primero.")
+        if self._staging_dirty:
+            return self._staging  # Cambios pendientes de escribir: mandan los de memoria
+        st = os.stat(self._staging_file_str)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._staging is None or stamp != self._staging_mtime:
+            self._staging = self._load_json(self._staging_file_str)
+            self._staging_set = set(self._staging["files"])
+            self._staging_mtime = stamp
+        return self._staging
+    
+    def set_staging(self, staging_data):
+        """
+        Reemplaza el contenido del staging y lo escribe en disco
+        (o al final del lote si se llama dentro de staging_batch()).
+        
+        Args:
+            staging_data (dict): Nuevo contenido del staging
+        """
+        self._staging = staging_data
+        self._staging_set = set(staging_data["files"])
+        self._staging_changed()
+    
+    def _staging_changed(self):
+        """Marca el staging en memoria como modificado y lo escribe si no hay un lote abierto."""
+        self._staging_dirty = True
+        if not self._staging_batch_depth:
+            self.flush()
+    
+    def flush(self, durable=False):
+        """
+        Escribe el staging en disco si tiene cambios pendientes.
+        
+        Args:
+            durable (bool): fsync del archivo y de .mygit para que el
+                reemplazo sobreviva a un corte de luz
+        """
+        if self._staging_dirty and self.mygit_path.exists():
+            self._save_json(self._staging_file_str, self._staging, durable=durable)
+            if durable:
+                self._fsync_dir(self.mygit_path)
+            st = os.stat(self._staging_file_str)
+            self._staging_mtime = (st.st_mtime_ns, st.st_size)
+        self._staging_dirty = False
+    
+    @staticmethod
+    def _fsync_dir(path):
+        """Hace persistente un os.replace dentro de `path` (no disponible en Windows)."""
+        try:
+            dfd = os.open(os.fspath(path), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dfd)
+        except OSError:
+            pass
+        finally:
+            os.close(dfd)
+    
+    @contextmanager
+    def staging_batch(self):
+        """
+        Agrupa varias modificaciones del staging en una única escritura.
         
-        return self._load_json(self.staging_file)
+        Ejemplo:
+            with repo.staging_batch():
+                repo.add_file("a.py")
+                repo.add_file("b.py")
+        """
+        self._staging_batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._staging_batch_depth -= 1
+            if not self._staging_batch_depth:
+                self.flush()
     
+    @contextmanager
+    def staging_transaction(self, timeout=0):
+        """
+        Como staging_batch(), pero además bloquea el staging para otros
+        procesos con .mygit/index.lock (como el index.lock de Git).
+        
+        Devuelve el staging ya leído de disco; se escribe una sola vez,
+        al salir, con un único fsync del archivo y de .mygit, y después se
+        libera el bloqueo.
+        
+        Args:
+            timeout (float): Segundos que se espera a que otro proceso
+                libere el bloqueo (0: fallar en seguida)
+        
+        Ejemplo:
+            with repo.staging_transaction():
+                repo.add_file("a.py")
+                repo.add_file("b.py")
+        """
+        if self._index_locked:
+            # Transacción anidada: el bloqueo ya es nuestro
+            with self.staging_batch():
+                yield self.get_staging()
+            return
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                os.close(os.open(self._index_lock_str, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                break
+            except FileExistsError:
+                if time.monotonic() >= deadline:
+                    raise Exception("Otro proceso está modificando el staging "
+                                    f"(si no es así, borra {self._index_lock_str})")
+                time.sleep(0.01)
+        self._index_locked = True
+        self._staging_batch_depth += 1
+        try:
+            yield self.get_staging()
+        finally:
+            self._staging_batch_depth -= 1
+            try:
+                if not self._staging_batch_depth:
+                    self.flush(durable=True)
+            finally:
+                self._index_locked = False
+                os.unlink(self._index_lock_str)
+    
+    @requires_repo
     def get_commits(self):
         """
         Obtiene la lista de todos los commits.
@@ -108,74 +436,641 @@ class Repository:
         Returns:
             list: Lista de commits
         """
-        if not self.is_repository():
-            raise Exception("No es un repositorio válido. Ejecuta 'init' primero.")
+        # Copia superficial: quien llama puede modificar la lista sin tocar la caché
+        return list(self._load_commits())
+    
+    def get_head(self):
+        """
+        Obtiene el ID del último commit sin leer el historial.
+        
+        Returns:
+            str or None: Hash del último commit, o None si no hay commits
+        """
+        return self.get_config().get("last_commit")
+    
+    @requires_repo
+    def get_commit_by_id(self, commit_id):
+        """
+        Busca un commit por su ID en O(1) usando la caché del historial.
+        
+        Args:
+            commit_id (str): Hash del commit a buscar
+            
+        Returns:
+            dict or None: Datos del commit si se encuentra
+        """
+        self._load_commits()
+        return self._commits_by_id.get(commit_id)
+    
+    @requires_repo
+    def get_commits_by_time(self):
+        """
+        Obtiene los commits ordenados por timestamp (del más antiguo al más reciente).
+        
+        La vista ordenada se construye una sola vez y se mantiene al agregar
+        commits, así que no se reordena el historial en cada consulta.
+        
+        Returns:
+            list: Commits ordenados por timestamp ascendente (no modificar)
+        """
+        commits = self._load_commits()
+        if self._commits_sorted is None:
+            # timestamp_ns: los commits antiguos guardan el timestamp como string ISO
+            self._commits_sorted = sorted(commits, key=lambda c: timestamp_ns(c["timestamp"]))
+            self._commits_timestamps = [timestamp_ns(c["timestamp"]) for c in self._commits_sorted]
+        return self._commits_sorted
+    
+    def append_commit(self, commit_data):
+        """
+        Agrega un commit al historial escribiendo una sola línea en commits.ndjson.
+        
+        commits.json no se reescribe: el costo de cada commit no depende
+        del tamaño del historial.
+        
+        Args:
+            commit_data (dict): Datos completos del commit
+            
+        Returns:
+            int: Número total de commits en el historial
+        """
+        self._load_commits()
+        if orjson is not None:
+            line = orjson.dumps(commit_data) + b"\n"
+        else:
+            line = json.dumps(commit_data, ensure_ascii=False).encode("utf-8") + b"\n"
+        
+        with open(self._commits_log_str, "ab") as f:
+            f.write(line)
+            end = f.tell()
+        self._append_graph_record(commit_data, end - len(line), end)
+        
+        if end - len(line) == self._commits_log_offset:
+            # Nadie escribió en el log desde nuestra última lectura
+            self._commits_log_offset = end
+            self._cache_commit(commit_data)
+            return len(self._commits_cache)
+        return len(self._load_commits())
+    
+    def _append_graph_record(self, commit_data, offset, log_end):
+        """
+        Agrega al commit-graph el registro de una línea recién escrita en el log.
+        
+        Solo si el graph cubría el log justo hasta esa línea; si no (graph
+        ausente o desactualizado) se deja como está y write_commit_graph()
+        lo reconstruye.
+        """
+        try:
+            with open(self._commit_graph_str, "r+b") as f:
+                magic, covered = COMMIT_GRAPH_HEADER.unpack(f.read(COMMIT_GRAPH_HEADER.size))
+                if magic != COMMIT_GRAPH_MAGIC or covered != offset:
+                    return
+                record = self._graph_record(commit_data, offset)
+                if record is None:
+                    return
+                f.seek(0, os.SEEK_END)
+                f.write(record)
+                f.seek(0)
+                f.write(COMMIT_GRAPH_HEADER.pack(COMMIT_GRAPH_MAGIC, log_end))
+        except (FileNotFoundError, struct.error):
+            pass
+    
+    @staticmethod
+    def _graph_record(commit_data, offset):
+        """Empaqueta un commit como registro del commit-graph (None si su id no es hexadecimal)."""
+        try:
+            commit_id = bytes.fromhex(commit_data["id"])
+            parent = bytes.fromhex(commit_data["parent"]) if commit_data.get("parent") else bytes(20)
+        except ValueError:
+            return None
+        if len(commit_id) != 20 or len(parent) != 20:
+            return None
+        return COMMIT_GRAPH_RECORD.pack(commit_id, parent, timestamp_ns(commit_data["timestamp"]), offset)
+    
+    @requires_repo
+    def write_commit_graph(self):
+        """
+        Reconstruye el commit-graph a partir de commits.ndjson.
+        
+        Returns:
+            bool: True si se escribió (los repos con commits en el formato
+            antiguo commits.json no usan commit-graph)
+        """
+        if self._has_legacy_commits():
+            return False
+        records = []
+        offset = 0
+        try:
+            with open(self._commits_log_str, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Escritura en curso: queda fuera del graph
+                    if line.strip():
+                        loads = orjson.loads if orjson is not None else json.loads
+                        record = self._graph_record(loads(line), offset)
+                        if record is None:
+                            return False
+                        records.append(record)
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+        tmp_file = f"{self._commit_graph_str}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(COMMIT_GRAPH_HEADER.pack(COMMIT_GRAPH_MAGIC, offset))
+            f.write(b"".join(records))
+        os.replace(tmp_file, self._commit_graph_str)
+        return True
+    
+    @requires_repo
+    def get_recent_commits(self, limit):
+        """
+        Obtiene los `limit` commits más recientes (del más reciente al más antiguo).
+        
+        Si el historial no está cargado en memoria y el commit-graph está al
+        día, se ordenan sus registros de tamaño fijo y solo se parsean las
+        líneas de esos `limit` commits, en lugar de todo commits.ndjson.
+        
+        Args:
+            limit (int): Número máximo de commits
+            
+        Returns:
+            list: Commits ordenados por timestamp descendente
+        """
+        if self._commits_cache is None:
+            commits = self._recent_from_graph(limit)
+            if commits is not None:
+                return commits
+        return self.get_commits_by_time()[:-limit - 1:-1]
+    
+    def _recent_from_graph(self, limit):
+        """Lee los últimos commits vía commit-graph; None si no se puede usar."""
+        try:
+            with open(self._commit_graph_str, "rb") as f:
+                data = f.read()
+            log_size = os.stat(self._commits_log_str).st_size
+        except FileNotFoundError:
+            return None
+        if len(data) < COMMIT_GRAPH_HEADER.size:
+            return None
+        magic, covered = COMMIT_GRAPH_HEADER.unpack_from(data)
+        body = memoryview(data)[COMMIT_GRAPH_HEADER.size:]
+        if (magic != COMMIT_GRAPH_MAGIC or covered != log_size
+                or len(body) % COMMIT_GRAPH_RECORD.size
+                or self._has_legacy_commits()):
+            return None
+        # Orden estable por timestamp, igual que get_commits_by_time()
+        records = sorted(COMMIT_GRAPH_RECORD.iter_unpack(body), key=lambda r: r[2])
+        loads = orjson.loads if orjson is not None else json.loads
+        commits = []
+        with open(self._commits_log_str, "rb") as f:
+            for _, _, _, offset in records[:-limit - 1:-1]:
+                f.seek(offset)
+                commits.append(loads(f.readline()))
+        return commits
+    
+    def _has_legacy_commits(self):
+        """
+        Indica si commits.json (formato antiguo) tiene commits. Se parsea una
+        sola vez y el resultado se reutiliza mientras no cambie el archivo.
+        """
+        key = self._stat_commits()
+        if self._legacy_commits_state is None or self._legacy_commits_state[0] != key:
+            self._legacy_commits_state = (key, bool(self._load_json(self._commits_file_str)))
+        return self._legacy_commits_state[1]
+    
+    def _stat_commits(self):
+        """Identifica la versión de commits.json en disco (mtime y tamaño)."""
+        st = os.stat(self._commits_file_str)
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _load_commits(self):
+        """
+        Devuelve la lista cacheada de commits, leyendo de disco solo lo que cambió.
         
-        return self._load_json(self.commits_file)
+        Returns:
+            list: Lista interna de commits (no modificar desde fuera)
+        """
+        stamp = self._stat_commits()
+        try:
+            log_size = os.stat(self._commits_log_str).st_size
+        except FileNotFoundError:
+            log_size = 0
+        
+        if (self._commits_cache is None or stamp != self._commits_mtime
+                or log_size < self._commits_log_offset):
+            commits = self._load_json(self._commits_file_str)
+            self._commits_cache = commits
+            self._commits_mtime = stamp
+            self._commits_log_offset = 0
+            self._commits_by_id = {c["id"]: c for c in commits}
+            self._commits_sorted = None
+            self._commits_timestamps = None
+        
+        if log_size > self._commits_log_offset:
+            for commit in self._read_commit_log():
+                self._cache_commit(commit)
+        return self._commits_cache
     
-    def _save_json(self, file_path, data):
+    def _read_commit_log(self):
+        """
+        Lee los commits agregados a commits.ndjson desde la última lectura.
+        
+        Returns:
+            list: Commits nuevos, en orden de escritura
+        """
+        with open(self._commits_log_str, "rb") as f:
+            f.seek(self._commits_log_offset)
+            data = f.read()
+        # Una línea sin "\n" final es una escritura en curso: se lee la próxima vez
+        complete = data.rfind(b"\n") + 1
+        self._commits_log_offset += complete
+        loads = orjson.loads if orjson is not None else json.loads
+        return [loads(line) for line in data[:complete].splitlines() if line.strip()]
+    
+    def _cache_commit(self, commit_data):
+        """Agrega un commit a la lista, al índice por id y a la vista ordenada."""
+        self._commits_cache.append(commit_data)
+        self._commits_by_id[commit_data["id"]] = commit_data
+        if self._commits_sorted is not None:
+            ts = timestamp_ns(commit_data["timestamp"])
+            pos = bisect.bisect_right(self._commits_timestamps, ts)
+            self._commits_timestamps.insert(pos, ts)
+            self._commits_sorted.insert(pos, commit_data)
+    
+    def _get_hash_cache(self):
+        """
+        Carga la caché de hashes la primera vez que se necesita.
+        
+        Returns:
+            dict: ruta absoluta -> [mtime_ns, tamaño, hash]
+        """
+        if self._hash_cache is None:
+            self.hash_backend  # Fija el archivo de caché del algoritmo del repo
+            try:
+                self._hash_cache = self._load_json(self._hash_cache_file_str)
+            except (OSError, ValueError):
+                self._hash_cache = {}
+        return self._hash_cache
+    
+    def save_hash_cache(self):
+        """
+        Guarda la caché de hashes en disco si hubo cambios.
+        """
+        if self._hash_cache_dirty and self.mygit_path.exists():
+            self._save_json(self._hash_cache_file_str, self._hash_cache)
+            self._hash_cache_dirty = False
+    
+    def object_path(self, content_hash):
+        """
+        Ruta de un objeto con el mismo reparto que Git: objects/ab/cdef...
+        
+        Args:
+            content_hash (str): Hash del contenido
+            
+        Returns:
+            Path: Ruta del objeto dentro de objects/
+        """
+        return self.objects_path / content_hash[:2] / content_hash[2:]
+    
+    def object_file(self, content_hash):
+        """
+        Como object_path, pero como strings y sin crear objetos Path.
+        
+        Args:
+            content_hash (str): Hash del contenido
+            
+        Returns:
+            tuple: (carpeta del prefijo, ruta del objeto)
+        """
+        shard_dir = self._objects_prefix + content_hash[:2]
+        return shard_dir, shard_dir + os.sep + content_hash[2:]
+    
+    def find_object(self, content_hash):
+        """
+        Localiza un objeto guardado, aceptando también el formato plano antiguo.
+        
+        Args:
+            content_hash (str): Hash del contenido
+            
+        Returns:
+            Path or None: Ruta del objeto si existe
+        """
+        path = self.object_path(content_hash)
+        if path.exists():
+            return path
+        legacy = self.objects_path / content_hash  # Repos creados antes del reparto
+        if legacy.exists():
+            return legacy
+        return None
+    
+    def migrate_flat_objects(self):
+        """
+        Mueve los objetos del formato plano antiguo (objects/<hash>) a su
+        subcarpeta por prefijo (objects/ab/cdef...).
+        
+        find_object sigue leyendo el formato plano, así que migrar es
+        opcional; solo evita tener miles de archivos en una carpeta.
+        
+        Returns:
+            int: Número de objetos movidos
+        """
+        moved = 0
+        with os.scandir(self.objects_path) as it:
+            flat = [entry.name for entry in it
+                    if len(entry.name) > 2 and entry.is_file(follow_symlinks=False)]
+        for name in flat:
+            shard_dir, object_file = self.object_file(name)
+            try:
+                os.mkdir(shard_dir)
+            except FileExistsError:
+                pass
+            os.replace(self._objects_prefix + name, object_file)
+            moved += 1
+        return moved
+    
+    def write_blob(self, file_path, content_hash=None):
+        """
+        Guarda el contenido de un archivo en objects/ comprimido con zlib.
+        
+        Si ya existe un objeto con ese hash no se vuelve a escribir. El
+        contenido se comprime desde un mmap a un archivo temporal que luego
+        se mueve con os.replace, así nunca queda un objeto a medio escribir.
+        
+        Args:
+            file_path (str): Ruta del archivo
+            content_hash (str): Hash ya calculado (se calcula si es None)
+            
+        Returns:
+            str: Hash SHA-1 del contenido
+        """
+        if content_hash is None:
+            content_hash = self.calculate_file_hash(file_path)
+        if content_hash in self._known_objects:
+            return content_hash
+        shard_dir, object_file = self.object_file(content_hash)
+        if os.path.exists(object_file):
+            self._known_objects.add(content_hash)
+            return content_hash  # Mismo contenido: no se duplica
+        try:
+            os.mkdir(shard_dir)
+        except FileExistsError:
+            pass
+        
+        tmp_file = f"{object_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        compressor = zlib.compressobj(BLOB_COMPRESSION_LEVEL)
+        try:
+            with open(file_path, 'rb') as src, open(tmp_file, 'xb') as dst:
+                size = os.fstat(src.fileno()).st_size
+                if size < SMALL_FILE_SIZE:
+                    # Archivos pequeños (y vacíos, que mmap no admite): una sola lectura
+                    dst.write(compressor.compress(src.read()))
+                else:
+                    # Se comprime directamente desde el page cache: las vistas
+                    # de memoryview no copian cada bloque a un bytes
+                    with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                            memoryview(mm) as view:
+                        for start in range(0, size, HASH_CHUNK_SIZE):
+                            dst.write(compressor.compress(view[start:start + HASH_CHUNK_SIZE]))
+                dst.write(compressor.flush())
+            os.replace(tmp_file, object_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_file)
+            except FileNotFoundError:
+                pass
+            raise
+        self._known_objects.add(content_hash)
+        return content_hash
+    
+    def read_object(self, content_hash):
+        """
+        Lee el contenido de un objeto guardado.
+        
+        Los objetos nuevos están comprimidos con zlib; los de repos anteriores
+        se guardaron tal cual y se reconocen porque su hash ya coincide.
+        
+        Raises:
+            Exception: Si el objeto no existe o su contenido no coincide con el hash
+        
+        Args:
+            content_hash (str): Hash del contenido
+            
+        Returns:
+            bytes: Contenido original del archivo
+        """
+        path = self.find_object(content_hash)
+        if path is None:
+            raise Exception(f"Objeto no encontrado: {content_hash}")
+        data = path.read_bytes()
+        backend = self.hash_backend
+        try:
+            content = zlib.decompress(data)
+        except zlib.error:
+            content = None
+        if content is not None and digest_bytes(content, backend) == content_hash:
+            return content
+        if digest_bytes(data, backend) == content_hash:
+            return data  # Objeto antiguo sin comprimir
+        raise Exception(f"Objeto corrupto: {content_hash}")
+    
+    def _save_json(self, file_path, data, durable=False):
         """
         Guarda datos en formato JSON.
         
+        Se escribe en un archivo temporal y se reemplaza el original con
+        os.replace: quien lea el archivo ve la versión anterior o la nueva
+        completa, nunca una escritura a medias.
+        
         Args:
-            file_path (Path): Ruta del archivo
+            file_path (str o Path): Ruta del archivo
             data: Datos a guardar
+            durable (bool): Hacer fsync antes del reemplazo
         """
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        file_path = os.fspath(file_path)
+        if orjson is not None:
+            # orjson ya produce UTF-8 sin escapar, igual que ensure_ascii=False;
+            # OPT_NON_STR_KEYS acepta claves no string como hace json.dump
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            payload = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+        
+        tmp_file = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, 'wb', buffering=JSON_WRITE_BUFFER) as f:
+                f.write(payload)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, file_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_file)
+            except FileNotFoundError:
+                pass
+            raise
     
     def _load_json(self, file_path):
         """
         Carga datos desde un archivo JSON.
         
         Args:
-            file_path (Path): Ruta del archivo
+            file_path (str o Path): Ruta del archivo
             
         Returns:
             dict/list: Datos cargados
         """
+        if orjson is not None:
+            with open(file_path, 'rb') as f:
+                return orjson.loads(f.read())
         with open(file_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def add_file(self, file_path):
+    @staticmethod
+    def _norm(file_path):
         """
-        Agrega un archivo al staging area (como 'git add archivo.py').
+        Normaliza las barras de una ruta al formato del staging ('/').
         
-        El staging area es donde preparamos archivos antes del commit.
+        En POSIX el separador ya es '/', así que no hay nada que reemplazar.
         
         Args:
-            file_path (str): Ruta del archivo a agregar
+            file_path (str): Ruta tal como llega a la API
             
         Returns:
-            bool: True si se agregó correctamente
+            str: Ruta con '/' como separador
         """
-        if not self.is_repository():
-            raise Exception("No es un repositorio válido. Ejecuta 'init' primero.")
+        if os.sep != "/":
+            return file_path.replace("\\", "/")
+        return file_path
+    
+    def _is_inside(self, full_path):
+        """
+        Indica si una ruta (resolviendo symlinks) queda dentro del repositorio.
         
-        # Convertir a Path para manejo más fácil
-        file_path = str(file_path).replace("\\", "/")  # Normalizar barras
-        full_path = self.path / file_path
+        Args:
+            full_path (Path o str): Ruta a comprobar
+            
+        Returns:
+            bool: True si está dentro del repositorio
+        """
+        real = os.path.realpath(full_path)
+        return real == self._path_str or real.startswith(self._path_str.rstrip(os.sep) + os.sep)
+    
+    def _iter_files(self, path=None):
+        """
+        Recorre el repositorio con os.scandir y genera un DirEntry por archivo.
+        
+        DirEntry reutiliza el tipo leído del directorio, así que no hace falta
+        un stat por entrada como con Path.rglob('*') + is_file(). Se omiten
+        los symlinks y la carpeta .mygit.
+        
+        Args:
+            path (str): Carpeta a recorrer (por defecto la raíz del repositorio)
+            
+        Yields:
+            os.DirEntry: Archivos regulares dentro de la carpeta
+        """
+        with os.scandir(path or self._path_str) as it:
+            for entry in it:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name != ".mygit":
+                        yield from self._iter_files(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+    
+    def _tracked_files(self):
+        """
+        Archivos con seguimiento y su hash más reciente.
+        
+        Cada commit solo guarda los archivos que estaban en staging, así que
+        el estado se reconstruye recorriendo el historial del más antiguo al
+        más reciente.
+        
+        Returns:
+            dict: {ruta: hash} de todos los archivos commiteados alguna vez
+        """
+        tracked = {}
+        for commit in self.get_commits_by_time():
+            tracked.update(commit["files"])
+        return tracked
+    
+    def _working_changes(self, committed, staged):
+        """
+        Compara el directorio de trabajo con lo commiteado.
+        
+        Args:
+            committed (dict): Archivos con seguimiento {ruta: hash} (ver _tracked_files)
+            staged (list): Archivos en staging
+            
+        Returns:
+            tuple: (archivos modificados, archivos sin seguimiento)
+        """
+        staged = set(staged)
+        prefix_len = len(self._path_str.rstrip(os.sep)) + 1
+        tracked, untracked = [], []
+        for entry in self._iter_files():
+            rel = self._norm(entry.path[prefix_len:])
+            if rel in staged:
+                continue
+            if rel not in committed:
+                untracked.append(rel)
+            else:
+                tracked.append((rel, entry))
+        
+        hashes = self.hash_many([entry.path for _, entry in tracked],
+                                [entry.stat() for _, entry in tracked])
+        modified = [rel for rel, entry in tracked if hashes[entry.path] != committed[rel]]
+        return sorted(modified), sorted(untracked)
+    
+    def _check_addable(self, file_path):
+        """
+        Normaliza una ruta y comprueba que se puede agregar al staging.
+        
+        Args:
+            file_path (str): Ruta del archivo, relativa al repositorio
+            
+        Returns:
+            str: Ruta normalizada, tal como se guarda en el staging
+        """
+        # Rutas como str hasta el final: sin objetos Path por archivo
+        file_path = self._norm(str(file_path))
+        full_path = os.path.join(self._path_str, file_path)
         
         # Verificar que el archivo existe
-        if not full_path.exists():
+        if not os.path.isfile(full_path):
             raise Exception(f"Archivo no encontrado: {file_path}")
         
         # Verificar que el archivo está dentro del repositorio
-        try:
-            full_path.resolve().relative_to(self.path.resolve())
-        except ValueError:
+        if not self._is_inside(full_path):
             raise Exception(f"El archivo debe estar dentro del repositorio: {file_path}")
+        return file_path
+    
+    @requires_repo
+    def add_file(self, file_path):
+        """
+        Agrega un archivo al staging area (como 'git add archivo.py').
+        
+        El staging area es donde preparamos archivos antes del commit.
+        
+        Args:
+            file_path (str): Ruta del archivo a agregar
+            
+        Returns:
+            bool: True si se agregó correctamente
+        """
+        file_path = self._check_addable(file_path)
         
         # Obtener staging actual
         staging_data = self.get_staging()
         
         # Agregar archivo si no está ya en staging
-        if file_path not in staging_data["files"]:
+        if file_path not in self._staging_set:
             staging_data["files"].append(file_path)
-            staging_data["timestamp"] = datetime.now().isoformat()
+            self._staging_set.add(file_path)
+            staging_data["timestamp"] = time.time_ns()
             
             # Guardar staging actualizado
-            self._save_json(self.staging_file, staging_data)
+            self._staging_changed()
             
             print(f"✅ Archivo agregado al staging: {file_path}")
             return True
@@ -183,6 +1078,43 @@ class Repository:
             print(f"📋 Archivo ya está en staging: {file_path}")
             return True
     
+    @requires_repo
+    def add_files(self, file_paths):
+        """
+        Agrega varios archivos al staging area de una sola vez.
+
+        Equivale a llamar add_file() por cada archivo, pero lee y escribe
+        staging.json una única vez en lugar de una vez por archivo.
+
+        Args:
+            file_paths (list): Rutas de los archivos a agregar
+
+        Returns:
+            bool: True si se agregaron correctamente
+        """
+        # Se valida todo antes de tocar el staging: un error no deja el lote a medias
+        normalized = [self._check_addable(file_path) for file_path in file_paths]
+
+        # Una sola lectura del staging
+        staging_data = self.get_staging()
+        already_staged = self._staging_set
+        new_files = []
+        for file_path in normalized:
+            if file_path not in already_staged:
+                already_staged.add(file_path)
+                new_files.append(file_path)
+
+        if new_files:
+            staging_data["files"].extend(new_files)
+            staging_data["timestamp"] = time.time_ns()
+            # Una sola escritura del staging
+            self._staging_changed()
+            print(f"✅ Archivos agregados al staging: {', '.join(new_files)}")
+        else:
+            print("📋 Todos los archivos ya están en staging")
+        return True
+
+    @requires_repo
     def remove_file_from_staging(self, file_path):
         """
         Remueve un archivo del staging area (como 'git reset archivo.py').
@@ -193,22 +1125,20 @@ class Repository:
         Returns:
             bool: True si se removió correctamente
         """
-        if not self.is_repository():
-            raise Exception("No es un repositorio válido. Ejecuta 'init' primero.")
-        
         # Normalizar ruta
-        file_path = str(file_path).replace("\\", "/")
+        file_path = self._norm(str(file_path))
         
         # Obtener staging actual
         staging_data = self.get_staging()
         
         # Remover archivo si está en staging
-        if file_path in staging_data["files"]:
+        if file_path in self._staging_set:
+            self._staging_set.discard(file_path)
             staging_data["files"].remove(file_path)
-            staging_data["timestamp"] = datetime.now().isoformat() if staging_data["files"] else None
+            staging_data["timestamp"] = time.time_ns() if staging_data["files"] else None
             
             # Guardar staging actualizado
-            self._save_json(self.staging_file, staging_data)
+            self._staging_changed()
             
             print(f"🗑️ Archivo removido del staging: {file_path}")
             return True
@@ -216,6 +1146,7 @@ class Repository:
             print(f"❌ Archivo no está en staging: {file_path}")
             return False
     
+    @requires_repo
     def status(self):
         """
         Muestra el estado del repositorio (como 'git status').
@@ -225,16 +1156,13 @@ class Repository:
         - Archivos modificados no agregados
         - Último commit
         """
-        if not self.is_repository():
-            raise Exception("No es un repositorio válido. Ejecuta 'init' primero.")
-        
         print("📊 Estado del repositorio:")
         print("=" * 40)
         
         # Información del último commit
-        config = self.get_config()
-        if config["last_commit"]:
-            print(f"📌 Último commit: {config['last_commit'][:8]}...")
+        head = self.get_head()
+        if head:
+            print(f"📌 Último commit: {head[:8]}...")
         else:
             print("📌 Último commit: (ninguno)")
         
@@ -249,33 +1177,93 @@ class Repository:
         else:
             print("\n📭 No hay archivos en staging")
         
+        # Cambios en el directorio de trabajo respecto a lo ya commiteado
+        modified, untracked = self._working_changes(self._tracked_files() if head else {}, staged_files)
+        if modified:
+            print(f"\n✏️ Archivos modificados sin agregar ({len(modified)}):")
+            for file_path in modified:
+                print(f"  📝 {file_path}")
+        if untracked:
+            print(f"\n❔ Archivos sin seguimiento ({len(untracked)}):")
+            for file_path in untracked:
+                print(f"  📄 {file_path}")
+        
         # Información adicional
         if staging_data["timestamp"]:
-            print(f"\n🕐 Última modificación del staging: {staging_data['timestamp']}")
+            # Se guarda como time.time_ns() (o ISO en repos antiguos): se formatea solo aquí
+            print(f"\n🕐 Última modificación del staging: {format_timestamp(staging_data['timestamp'])}")
         
         print("\n💡 Comandos disponibles:")
         print("  - add_file('archivo.py') : agregar archivo al staging")
         print("  - remove_file_from_staging('archivo.py') : remover del staging")
         print("  - commit.create('mensaje') : crear commit")
     
-    def calculate_file_hash(self, file_path):
+    def hash_many(self, file_paths, stats=None):
+        """
+        Calcula el hash SHA-1 de varios archivos.
+        
+        Primero se resuelven en este hilo los que ya están en la caché de
+        hashes; el resto se hashea en paralelo con map_files (hashlib libera
+        el GIL mientras procesa cada bloque). Al final se guarda la caché.
+        
+        Args:
+            file_paths (list): Rutas de los archivos
+            stats (list): os.stat_result de cada ruta, si ya se tienen
+            
+        Returns:
+            dict: ruta -> hash SHA-1
+        """
+        if stats is None:
+            stats = [None] * len(file_paths)
+        cache = self._get_hash_cache()
+        result = {}
+        pending = []
+        for file_path, st in zip(file_paths, stats):
+            if st is not None:
+                cached = cache.get(os.path.abspath(file_path))
+                if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                    result[file_path] = cached[2]
+                    continue
+            pending.append((file_path, st))
+        
+        hashes = map_files(lambda item: self.calculate_file_hash(*item), pending)
+        for (file_path, _), content_hash in zip(pending, hashes):
+            result[file_path] = content_hash
+        self.save_hash_cache()
+        return result
+    
+    def calculate_file_hash(self, file_path, st=None):
         """
         Calcula el hash SHA-1 de un archivo.
         
+        Si el archivo no cambió (mismo mtime y tamaño) desde la última vez,
+        devuelve el hash guardado en hashcache.json sin volver a leerlo.
+        
         Args:
             file_path (str): Ruta del archivo
+            st (os.stat_result): Stat ya obtenido (p. ej. de DirEntry.stat())
             
         Returns:
             str: Hash SHA-1 del archivo
         """
-        sha1 = hashlib.sha1()
-        
         try:
-            with open(file_path, 'rb') as f:
-                # Leer el archivo en chunks para archivos grandes
-                for chunk in iter(lambda: f.read(4096), b""):
-                    sha1.update(chunk)
-            return sha1.hexdigest()
+            key = os.path.abspath(file_path)
+            if st is None:
+                st = os.stat(file_path)
+            cache = self._get_hash_cache()
+            cached = cache.get(key)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                return cached[2]
+            
+            # Sin buffering: file_digest/readinto ya leen en bloques grandes
+            backend = self.hash_backend
+            with open(file_path, 'rb', buffering=0) as f:
+                digest = file_sha1(f, backend)
+            
+            if st.st_mtime_ns < time.time_ns() - HASH_CACHE_MIN_AGE_NS:
+                cache[key] = [st.st_mtime_ns, st.st_size, digest]
+                self._hash_cache_dirty = True
+            return digest
         except FileNotFoundError:
             raise Exception(f"Archivo no encontrado: {file_path}")
         except Exception as e:
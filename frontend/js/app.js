@@ -39,8 +39,12 @@ class MiniGitAPI {
     async getCommitHistory(limit = 10) { return this.request(`/log?limit=${limit}`); }
     /** Lista todos los archivos del repositorio */
     async listFiles() { return this.request('/files'); }
-    /** Obtiene el contenido de un archivo */
-    async getFileContent(filePath) { return this.request(`/file/${encodeURIComponent(filePath)}`); }
+    /** Obtiene el contenido de un archivo (descarga directa, sin envolverlo en JSON) */
+    async getFileContent(filePath) {
+        const response = await fetch(`${this.baseURL}/file_raw/${encodeURIComponent(filePath)}`);
+        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+        return { name: filePath, content: await response.text() };
+    }
     /** Obtiene los detalles de un commit */
     async getCommitDetails(commitHash) { return this.request(`/commit/${commitHash}`); }
     /** Elimina un archivo del repositorio */
@@ -119,7 +123,8 @@ class UIHelper {
     }
     /** Formatea una fecha a string legible en español */
     static formatDate(dateString) {
-        const date = new Date(dateString);
+        // Los commits nuevos guardan nanosegundos UNIX (número); los antiguos, un string ISO
+        const date = typeof dateString === 'number' ? new Date(dateString / 1e6) : new Date(dateString);
         return date.toLocaleString('es-ES', { year: 'numeric', month: '2-digit', day: '2-digit', hour: '2-digit', minute: '2-digit' });
     }
     /** Muestra u oculta un spinner de carga sobre un elemento */
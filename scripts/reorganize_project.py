@@ -1,4 +1,5 @@
 import os
+import errno
 import shutil
 
 #Idea de orden de carpetas y archivos para un proyecto de software
@@ -39,7 +40,9 @@ mini-git-project/
 
 """
 
-# reorganize_project.py
+# scripts/reorganize_project.py
+# Script de una sola vez: ejecutarlo desde la raíz con
+#   python scripts/reorganize_project.py
 
 
 # Estructura de carpetas y archivos a crear
@@ -81,21 +84,30 @@ move_files = {
 }
 
 def ensure_structure():
-    for folder, files in structure.items():
-        os.makedirs(folder, exist_ok=True)
-        for file in files:
-            file_path = os.path.join(folder, file)
-            dir_path = os.path.dirname(file_path)
-            if dir_path and not os.path.exists(dir_path):
-                os.makedirs(dir_path, exist_ok=True)
-            if not os.path.exists(file_path):
-                with open(file_path, "w", encoding="utf-8") as f:
-                    pass  # Crea archivos vacíos si no existen
+    file_paths = [os.path.join(folder, file)
+                  for folder, files in structure.items() for file in files]
+    
+    # Cada carpeta distinta se crea una sola vez
+    dirs = set(structure) | {os.path.dirname(path) for path in file_paths}
+    for dir_path in sorted(dirs):
+        os.makedirs(dir_path, exist_ok=True)
+    
+    # O_CREAT sin O_TRUNC: crea el archivo vacío si no existe y no toca los existentes
+    for file_path in file_paths:
+        os.close(os.open(file_path, os.O_CREAT | os.O_WRONLY, 0o644))
 
 def move_existing_files():
     for filename, target_folder in move_files.items():
-        if os.path.exists(filename):
-            shutil.move(filename, os.path.join(target_folder, filename))
+        target = os.path.join(target_folder, filename)
+        try:
+            # Mismo sistema de archivos: un solo rename, sin copiar contenido
+            os.replace(filename, target)
+        except FileNotFoundError:
+            continue  # No está en la raíz: nada que mover
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(filename, target)
 
 def main():
     ensure_structure()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Raíz del proyecto en el PATH para importar backend/ y core/ desde cualquier carpeta
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backend.app as backend_app
+from backend.minigit_core import WebRepository
+
+
+@pytest.fixture
+def api_client(tmp_path):
+    """
+    TestClient de la API contra un repositorio recién inicializado en tmp_path.
+
+    mini_git y web_repo de backend.app apuntan por defecto a ./mini_git_repo
+    (relativo al directorio actual): durante la prueba se sustituyen por
+    instancias sobre tmp_path y al terminar se restauran.
+    """
+    repo_path = str(tmp_path)
+    saved = backend_app.mini_git, backend_app.web_repo
+    backend_app.mini_git = backend_app.MiniGitCore(repo_path)
+    backend_app.web_repo = WebRepository(repo_path)
+    try:
+        # Como context manager se ejecuta el lifespan (y se cierra el pool de commits)
+        with TestClient(backend_app.app) as client:
+            assert client.post("/api/init").status_code == 200
+            assert backend_app.web_repo.init()["success"]
+            yield client
+    finally:
+        backend_app.mini_git, backend_app.web_repo = saved
@@ -7,10 +7,38 @@ Esto simula el uso real del sistema.
 """
 
 import os
+import io
+import atexit
+import shutil
 import tempfile
+from contextlib import redirect_stdout
 from pathlib import Path
 from repository import Repository
-from commit import Commit
+from commit import Commit, HEX_LEN
+
+# El detalle paso a paso solo se muestra al ejecutar el archivo directamente
+# o con MINIGIT_TEST_VERBOSE=1: bajo pytest cada print pasa por la captura
+VERBOSE = bool(os.environ.get("MINIGIT_TEST_VERBOSE")) or __name__ == "__main__"
+
+def _p(*args, **kwargs):
+    if VERBOSE:
+        print(*args, **kwargs)
+
+# Repositorio recién inicializado que se copia en cada prueba que no prueba init()
+_TEMPLATE_DIR = None
+
+def _fresh_repo(temp_dir):
+    """
+    Devuelve un Repository ya inicializado en temp_dir copiando la carpeta
+    .mygit de una plantilla, que se crea con init() una sola vez por proceso.
+    """
+    global _TEMPLATE_DIR
+    if _TEMPLATE_DIR is None:
+        _TEMPLATE_DIR = tempfile.mkdtemp(prefix="minigit-template-")
+        atexit.register(shutil.rmtree, _TEMPLATE_DIR, True)
+        Repository(_TEMPLATE_DIR).init()
+    shutil.copytree(os.path.join(_TEMPLATE_DIR, ".mygit"), os.path.join(temp_dir, ".mygit"))
+    return Repository(temp_dir)
 
 def test_complete_workflow():
     """
@@ -21,78 +49,73 @@ def test_complete_workflow():
     4. Hacer commits
     5. Ver historial
     """
-    print("=" * 60)
-    print("🧪 TEST: Flujo completo de trabajo")  
-    print("=" * 60)
+    _p("=" * 60)
+    _p("🧪 TEST: Flujo completo de trabajo")  
+    _p("=" * 60)
     
     with tempfile.TemporaryDirectory() as temp_dir:
-        original_dir = os.getcwd()
-        os.chdir(temp_dir)
+        # 1. INICIALIZAR REPOSITORIO
+        _p("\n1️⃣ Inicializando repositorio...")
+        repo = Repository(temp_dir)
+        repo.init()
+        _p("✅ Repositorio inicializado")
         
-        try:
-            # 1. INICIALIZAR REPOSITORIO
-            print("\n1️⃣ Inicializando repositorio...")
-            repo = Repository()
-            repo.init()
-            print("✅ Repositorio inicializado")
-            
-            # 2. CREAR ARCHIVOS DE PRUEBA
-            print("\n2️⃣ Creando archivos de prueba...")
-            
-            # Archivo 1: main.py
-            with open("main.py", "w", encoding="utf-8") as f:
-                f.write("""#!/usr/bin/env python3
+        # 2. CREAR ARCHIVOS DE PRUEBA
+        _p("\n2️⃣ Creando archivos de prueba...")
+        
+        # Archivo 1: main.py
+        Path(temp_dir, "main.py").write_bytes("""#!/usr/bin/env python3
 # Archivo principal del proyecto
 def main():
     print("Hola mundo!")
     
 if __name__ == "__main__":
     main()
-""")
-            
-            # Archivo 2: utils.py  
-            with open("utils.py", "w", encoding="utf-8") as f:
-                f.write("""# Utilidades del proyecto
+""".encode("utf-8"))
+        
+        # Archivo 2: utils.py  
+        Path(temp_dir, "utils.py").write_bytes("""# Utilidades del proyecto
 def saludar(nombre):
     return f"Hola {nombre}!"
 
 def calcular(a, b):
     return a + b
-""")
-            
-            print("✅ Archivos creados: main.py, utils.py")
-            
-            # 3. PROBAR STATUS INICIAL
-            print("\n3️⃣ Estado inicial del repositorio...")
-            repo.status()
-            
-            # 4. AGREGAR ARCHIVOS AL STAGING
-            print("\n4️⃣ Agregando archivos al staging...")
+""".encode("utf-8"))
+        
+        _p("✅ Archivos creados: main.py, utils.py")
+        
+        # 3. PROBAR STATUS INICIAL
+        _p("\n3️⃣ Estado inicial del repositorio...")
+        repo.status()
+        
+        # 4. AGREGAR ARCHIVOS AL STAGING
+        _p("\n4️⃣ Agregando archivos al staging...")
+        # Una sola escritura de staging.json para los dos archivos
+        with repo.staging_transaction():
             repo.add_file("main.py")
             repo.add_file("utils.py")
-            
-            # 5. VERIFICAR STATUS DESPUÉS DE ADD
-            print("\n5️⃣ Estado después de agregar archivos...")
-            repo.status()
-            
-            # 6. CREAR PRIMER COMMIT
-            print("\n6️⃣ Creando primer commit...")
-            commit_manager = Commit(repo)
-            commit1_id = commit_manager.create("Initial commit: added main.py and utils.py")
-            
-            assert len(commit1_id) == 40, "❌ ID de commit debe tener 40 caracteres"
-            print(f"✅ Primer commit creado: {commit1_id[:8]}...")
-            
-            # 7. VERIFICAR STATUS DESPUÉS DEL COMMIT
-            print("\n7️⃣ Estado después del commit...")
-            repo.status()
-            
-            # 8. MODIFICAR ARCHIVO Y HACER SEGUNDO COMMIT
-            print("\n8️⃣ Modificando archivo para segundo commit...")
-            
-            # Modificar utils.py
-            with open("utils.py", "w", encoding="utf-8") as f:
-                f.write("""# Utilidades del proyecto
+        
+        # 5. VERIFICAR STATUS DESPUÉS DE ADD
+        _p("\n5️⃣ Estado después de agregar archivos...")
+        repo.status()
+        
+        # 6. CREAR PRIMER COMMIT
+        _p("\n6️⃣ Creando primer commit...")
+        commit_manager = Commit(repo)
+        commit1_id = commit_manager.create("Initial commit: added main.py and utils.py")
+        
+        assert len(commit1_id) == HEX_LEN, f"❌ ID de commit debe tener {HEX_LEN} caracteres"
+        _p(f"✅ Primer commit creado: {commit1_id[:8]}...")
+        
+        # 7. VERIFICAR STATUS DESPUÉS DEL COMMIT
+        _p("\n7️⃣ Estado después del commit...")
+        repo.status()
+        
+        # 8. MODIFICAR ARCHIVO Y HACER SEGUNDO COMMIT
+        _p("\n8️⃣ Modificando archivo para segundo commit...")
+        
+        # Modificar utils.py
+        Path(temp_dir, "utils.py").write_bytes("""# Utilidades del proyecto
 def saludar(nombre):
     return f"Hola {nombre}!"
 
@@ -101,179 +124,208 @@ def calcular(a, b):
 
 def despedir(nombre):
     return f"Adiós {nombre}!"
-""")
-            
-            # Crear nuevo archivo
-            with open("config.txt", "w", encoding="utf-8") as f:
-                f.write("# Configuración del proyecto\nversion=1.0\nauthor=user\n")
-            
-            # Agregar archivos modificados/nuevos
+""".encode("utf-8"))
+        
+        # Crear nuevo archivo
+        Path(temp_dir, "config.txt").write_bytes("# Configuración del proyecto\nversion=1.0\nauthor=user\n".encode("utf-8"))
+        
+        # Agregar archivos modificados/nuevos
+        with repo.staging_transaction():
             repo.add_file("utils.py")      # Archivo modificado
             repo.add_file("config.txt")    # Archivo nuevo
-            
-            print("✅ Archivos modificados y agregados al staging")
-            
-            # 9. SEGUNDO COMMIT
-            print("\n9️⃣ Creando segundo commit...")
-            commit2_id = commit_manager.create("Added farewell function and config file")
-            
-            assert len(commit2_id) == 40, "❌ ID de commit debe tener 40 caracteres"
-            assert commit1_id != commit2_id, "❌ Los commits deben tener IDs diferentes"
-            print(f"✅ Segundo commit creado: {commit2_id[:8]}...")
-            
-            # 10. VER HISTORIAL COMPLETO
-            print("\n🔟 Mostrando historial completo...")
-            commit_manager.show_log()
-            
-            # 11. VERIFICAR DATOS DE COMMITS
-            print("\n1️⃣1️⃣ Verificando datos de commits...")
-            
-            commits = commit_manager.get_history()
-            assert len(commits) == 2, f"❌ Debería haber 2 commits, hay {len(commits)}"
-            
-            # El más reciente debe ser el segundo
-            latest_commit = commits[0]
-            assert latest_commit["id"] == commit2_id, "❌ El commit más reciente debe ser el segundo"
-            assert latest_commit["parent"] == commit1_id, "❌ El segundo commit debe tener al primero como padre"
-            
-            # El primero no debe tener padre
-            first_commit = commits[1]
-            assert first_commit["id"] == commit1_id, "❌ El segundo en la lista debe ser el primer commit"
-            assert first_commit["parent"] is None, "❌ El primer commit no debe tener padre"
-            
-            print("✅ Relaciones entre commits correctas")
-            
-            # 12. VERIFICAR ARCHIVOS EN OBJECTS
-            print("\n1️⃣2️⃣ Verificando archivos en objects...")
-            
-            objects_dir = repo.objects_path
-            object_files = list(objects_dir.glob("*"))
-            
-            # Deberíamos tener al menos 4 archivos:
-            # - main.py (versión 1)
-            # - utils.py (versión 1) 
-            # - utils.py (versión 2)
-            # - config.txt (versión 1)
-            assert len(object_files) >= 3, f"❌ Debería haber al menos 3 archivos en objects, hay {len(object_files)}"
-            
-            print(f"✅ {len(object_files)} archivos guardados en objects/")
-            
-            print("\n🎉" * 20)
-            print("🎉 FLUJO COMPLETO FUNCIONA PERFECTAMENTE 🎉")
-            print("🎉" * 20)
-            
-        finally:
-            os.chdir(original_dir)
+        
+        _p("✅ Archivos modificados y agregados al staging")
+        
+        # 9. SEGUNDO COMMIT
+        _p("\n9️⃣ Creando segundo commit...")
+        commit2_id = commit_manager.create("Added farewell function and config file")
+        
+        assert len(commit2_id) == HEX_LEN, f"❌ ID de commit debe tener {HEX_LEN} caracteres"
+        assert commit1_id != commit2_id, "❌ Los commits deben tener IDs diferentes"
+        _p(f"✅ Segundo commit creado: {commit2_id[:8]}...")
+        
+        # 10. VER HISTORIAL COMPLETO
+        _p("\n🔟 Mostrando historial completo...")
+        commit_manager.show_log()
+        
+        # 11. VERIFICAR DATOS DE COMMITS
+        _p("\n1️⃣1️⃣ Verificando datos de commits...")
+        
+        commits = commit_manager.get_history()
+        assert len(commits) == 2, f"❌ Debería haber 2 commits, hay {len(commits)}"
+        
+        # El más reciente debe ser el segundo
+        latest_commit = commits[0]
+        assert latest_commit["id"] == commit2_id, "❌ El commit más reciente debe ser el segundo"
+        assert latest_commit["parent"] == commit1_id, "❌ El segundo commit debe tener al primero como padre"
+        
+        # El primero no debe tener padre
+        first_commit = commits[1]
+        assert first_commit["id"] == commit1_id, "❌ El segundo en la lista debe ser el primer commit"
+        assert first_commit["parent"] is None, "❌ El primer commit no debe tener padre"
+        
+        _p("✅ Relaciones entre commits correctas")
+        
+        # 12. VERIFICAR ARCHIVOS EN OBJECTS
+        _p("\n1️⃣2️⃣ Verificando archivos en objects...")
+        
+        objects_dir = repo.objects_path
+        # Los objetos se reparten en subcarpetas por prefijo (objects/ab/cdef...);
+        # os.scandir da el tipo de cada entrada sin crear un Path ni hacer stat
+        object_count = 0
+        with os.scandir(objects_dir) as shards:
+            for shard in shards:
+                if shard.is_dir():
+                    with os.scandir(shard.path) as entries:
+                        object_count += sum(1 for entry in entries if entry.is_file())
+        
+        # Deberíamos tener al menos 4 archivos:
+        # - main.py (versión 1)
+        # - utils.py (versión 1) 
+        # - utils.py (versión 2)
+        # - config.txt (versión 1)
+        assert object_count >= 3, f"❌ Debería haber al menos 3 archivos en objects, hay {object_count}"
+        
+        _p(f"✅ {object_count} archivos guardados en objects/")
+        
+        # Los objetos se guardan comprimidos, pero read_object devuelve el original
+        config_hash = latest_commit["files"]["config.txt"]
+        with open(os.path.join(temp_dir, "config.txt"), "rb") as f:
+            assert repo.read_object(config_hash) == f.read(), "❌ read_object debería devolver el contenido original"
+        _p("✅ Contenido recuperado desde objects/")
+        
+        _p("\n🎉" * 20)
+        _p("🎉 FLUJO COMPLETO FUNCIONA PERFECTAMENTE 🎉")
+        _p("🎉" * 20)
+
 
 def test_staging_operations():
     """
     Prueba operaciones específicas del staging area.
     """
-    print("\n" + "=" * 60)
-    print("🧪 TEST: Operaciones de staging")
-    print("=" * 60)
+    _p("\n" + "=" * 60)
+    _p("🧪 TEST: Operaciones de staging")
+    _p("=" * 60)
     
     with tempfile.TemporaryDirectory() as temp_dir:
-        original_dir = os.getcwd()
-        os.chdir(temp_dir)
+        # Repositorio inicializado (copia de la plantilla)
+        repo = _fresh_repo(temp_dir)
+        
+        # Crear archivo de prueba
+        Path(temp_dir, "test.py").write_bytes("print('test')".encode("utf-8"))
+        
+        # 1. AGREGAR ARCHIVO
+        _p("\n1️⃣ Agregando archivo al staging...")
+        repo.add_file("test.py")
+        
+        staging = repo.get_staging()
+        assert "test.py" in staging["files"], "❌ Archivo debería estar en staging"
+        _p("✅ Archivo agregado correctamente")
+        
+        # 2. AGREGAR EL MISMO ARCHIVO (NO DEBE DUPLICAR)
+        _p("\n2️⃣ Agregando mismo archivo otra vez...")
+        repo.add_file("test.py")
         
+        staging = repo.get_staging()
+        assert staging["files"].count("test.py") == 1, "❌ No debería duplicar archivos"
+        _p("✅ No duplica archivos en staging")
+        
+        # 3. REMOVER ARCHIVO DEL STAGING
+        _p("\n3️⃣ Removiendo archivo del staging...")
+        result = repo.remove_file_from_staging("test.py")
+        
+        assert result is True, "❌ Remove debería retornar True"
+        
+        staging = repo.get_staging()
+        assert "test.py" not in staging["files"], "❌ Archivo debería haberse removido"
+        _p("✅ Archivo removido correctamente")
+        
+        # 4. REMOVER ARCHIVO QUE NO ESTÁ EN STAGING
+        _p("\n4️⃣ Removiendo archivo que no está en staging...")
+        result = repo.remove_file_from_staging("test.py")
+        
+        assert result is False, "❌ Remove debería retornar False para archivo no existente"
+        _p("✅ Manejo correcto de archivo no existente")
+        
+        # 5. INTENTAR AGREGAR ARCHIVO INEXISTENTE
+        _p("\n5️⃣ Intentando agregar archivo inexistente...")
         try:
-            # Inicializar repositorio
-            repo = Repository()
-            repo.init()
-            
-            # Crear archivo de prueba
-            with open("test.py", "w") as f:
-                f.write("print('test')")
-            
-            # 1. AGREGAR ARCHIVO
-            print("\n1️⃣ Agregando archivo al staging...")
-            repo.add_file("test.py")
-            
-            staging = repo.get_staging()
-            assert "test.py" in staging["files"], "❌ Archivo debería estar en staging"
-            print("✅ Archivo agregado correctamente")
-            
-            # 2. AGREGAR EL MISMO ARCHIVO (NO DEBE DUPLICAR)
-            print("\n2️⃣ Agregando mismo archivo otra vez...")
-            repo.add_file("test.py")
-            
-            staging = repo.get_staging()
-            assert staging["files"].count("test.py") == 1, "❌ No debería duplicar archivos"
-            print("✅ No duplica archivos en staging")
-            
-            # 3. REMOVER ARCHIVO DEL STAGING
-            print("\n3️⃣ Removiendo archivo del staging...")
-            result = repo.remove_file_from_staging("test.py")
-            
-            assert result == True, "❌ Remove debería retornar True"
-            
-            staging = repo.get_staging()
-            assert "test.py" not in staging["files"], "❌ Archivo debería haberse removido"
-            print("✅ Archivo removido correctamente")
-            
-            # 4. REMOVER ARCHIVO QUE NO ESTÁ EN STAGING
-            print("\n4️⃣ Removiendo archivo que no está en staging...")
-            result = repo.remove_file_from_staging("test.py")
-            
-            assert result == False, "❌ Remove debería retornar False para archivo no existente"
-            print("✅ Manejo correcto de archivo no existente")
-            
-            # 5. INTENTAR AGREGAR ARCHIVO INEXISTENTE
-            print("\n5️⃣ Intentando agregar archivo inexistente...")
-            try:
-                repo.add_file("archivo_inexistente.py")
-                assert False, "❌ Debería lanzar excepción"
-            except Exception as e:
-                print(f"✅ Correctamente lanzó excepción: {e}")
-            
-            print("\n✅ TODAS LAS OPERACIONES DE STAGING FUNCIONAN")
-            
-        finally:
-            os.chdir(original_dir)
+            repo.add_file("archivo_inexistente.py")
+            assert False, "❌ Debería lanzar excepción"
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
+        
+        _p("\n✅ TODAS LAS OPERACIONES DE STAGING FUNCIONAN")
+
 
 def test_empty_commit():
     """
     Prueba intentar hacer commit sin archivos en staging.
     """
-    print("\n" + "=" * 60)
-    print("🧪 TEST: Commit vacío")
-    print("=" * 60)
+    _p("\n" + "=" * 60)
+    _p("🧪 TEST: Commit vacío")
+    _p("=" * 60)
     
     with tempfile.TemporaryDirectory() as temp_dir:
-        original_dir = os.getcwd()
-        os.chdir(temp_dir)
+        repo = _fresh_repo(temp_dir)
+        commit_manager = Commit(repo)
         
+        # Intentar commit sin archivos en staging
+        _p("1️⃣ Intentando commit sin archivos en staging...")
         try:
-            repo = Repository()
-            repo.init()
-            commit_manager = Commit(repo)
-            
-            # Intentar commit sin archivos en staging
-            print("1️⃣ Intentando commit sin archivos en staging...")
-            try:
-                commit_manager.create("Commit vacío")
-                assert False, "❌ Debería lanzar excepción"
-            except Exception as e:
-                print(f"✅ Correctamente lanzó excepción: {e}")
-            
-            # Intentar commit con mensaje vacío
-            print("\n2️⃣ Intentando commit con mensaje vacío...")
-            with open("test.py", "w") as f:
-                f.write("print('test')")
-            
-            repo.add_file("test.py")
-            
-            try:
-                commit_manager.create("")  # Mensaje vacío
-                assert False, "❌ Debería lanzar excepción"
-            except Exception as e:
-                print(f"✅ Correctamente lanzó excepción: {e}")
-            
-            print("\n✅ VALIDACIONES DE COMMIT FUNCIONAN")
-            
-        finally:
-            os.chdir(original_dir)
+            commit_manager.create("Commit vacío")
+            assert False, "❌ Debería lanzar excepción"
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
+        
+        # Intentar commit con mensaje vacío
+        _p("\n2️⃣ Intentando commit con mensaje vacío...")
+        Path(temp_dir, "test.py").write_bytes("print('test')".encode("utf-8"))
+        
+        repo.add_file("test.py")
+        
+        try:
+            commit_manager.create("")  # Mensaje vacío
+            assert False, "❌ Debería lanzar excepción"
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
+        
+        _p("\n✅ VALIDACIONES DE COMMIT FUNCIONAN")
+
+
+def test_status_across_commits():
+    """
+    Prueba que status() tiene en cuenta todo el historial, no solo el último commit.
+    """
+    _p("\n" + "=" * 60)
+    _p("🧪 TEST: Status con archivos de commits anteriores")
+    _p("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo = _fresh_repo(temp_dir)
+        commit_manager = Commit(repo)
+        
+        _p("1️⃣ Commiteando a.txt y b.txt en commits separados...")
+        for name in ("a.txt", "b.txt"):
+            Path(temp_dir, name).write_bytes(f"contenido de {name}".encode("utf-8"))
+            repo.add_file(name)
+            commit_manager.create(f"Agregar {name}")
+        
+        out = io.StringIO()
+        with redirect_stdout(out):
+            repo.status()
+        assert "sin seguimiento" not in out.getvalue(), f"❌ a.txt no debería salir sin seguimiento:\n{out.getvalue()}"
+        _p("✅ Ningún archivo commiteado aparece sin seguimiento")
+        
+        _p("\n2️⃣ Modificando a.txt (del primer commit)...")
+        Path(temp_dir, "a.txt").write_bytes("contenido nuevo".encode("utf-8"))
+        out = io.StringIO()
+        with redirect_stdout(out):
+            repo.status()
+        assert "modificados sin agregar (1)" in out.getvalue(), f"❌ a.txt debería salir modificado:\n{out.getvalue()}"
+        assert "📝 a.txt" in out.getvalue(), "❌ a.txt debería salir modificado"
+        _p("✅ a.txt aparece como modificado")
+
 
 def run_all_tests():
     """
@@ -286,6 +338,7 @@ def run_all_tests():
         test_complete_workflow()
         test_staging_operations()  
         test_empty_commit()
+        test_status_across_commits()
         
         print("\n" + "🎉" * 25)
         print("🎉 TODAS LAS PRUEBAS DEL FLUJO COMPLETO PASARON 🎉")
@@ -1,25 +1,26 @@
-import requests
 import os
-import time
+from pathlib import Path
 
-def test_diff_file():
-    base_url = "http://localhost:8000/api"
+import pytest
+
+# api_client (tests/conftest.py) invoca la app en el mismo proceso contra un
+# repo temporal: no hace falta un backend levantado
+def test_diff_file(api_client, tmp_path):
+    client = api_client
     test_file = "diff_test.txt"
-    file_path = os.path.join("backend", "mini_git_repo", test_file)
+    file_path = os.path.join(tmp_path, test_file)
 
     # 1. Crear archivo y hacer commit inicial
-    r = requests.post(f"{base_url}/add", json=[{"name": test_file, "content": "linea1\nlinea2\n"}])
+    r = client.post("/api/add", json=[{"name": test_file, "content": "linea1\nlinea2\n"}])
     assert r.status_code == 200
-    r = requests.post(f"{base_url}/commit", json={"message": "commit inicial"})
+    r = client.post("/api/commit", json={"message": "commit inicial"})
     assert r.status_code == 200
 
-    # 2. Modificar archivo
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write("linea1\nlinea2\nlinea3\n")
-    time.sleep(0.5)  # Esperar a que el backend detecte el cambio
+    # 2. Modificar archivo (el endpoint lo ve en seguida: mismo proceso, sin esperas)
+    Path(file_path).write_bytes("linea1\nlinea2\nlinea3\n".encode("utf-8"))
 
     # 3. Pedir diff
-    r = requests.get(f"{base_url}/diff/{test_file}")
+    r = client.get(f"/api/diff/{test_file}")
     assert r.status_code == 200
     data = r.json()
     assert data["success"]
@@ -28,9 +29,5 @@ def test_diff_file():
     assert "+linea3" in diff
     print("Diff generado correctamente:\n", diff)
 
-    # 4. Limpiar
-    os.remove(file_path)
-
 if __name__ == "__main__":
-    test_diff_file()
-    print("Test de diff_file PASÓ correctamente.")
+    raise SystemExit(pytest.main([__file__]))
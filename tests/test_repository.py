@@ -13,201 +13,289 @@ from pathlib import Path
 # desde el módulo core.repository
 import pytest
 from core.repository import Repository
+from core.commit import HEX_LEN
+
+# El detalle paso a paso solo se muestra al ejecutar el archivo directamente
+# o con MINIGIT_TEST_VERBOSE=1: bajo pytest cada print pasa por la captura
+VERBOSE = bool(os.environ.get("MINIGIT_TEST_VERBOSE")) or __name__ == "__main__"
+
+def _p(*args, **kwargs):
+    if VERBOSE:
+        print(*args, **kwargs)
 
 
 def test_basic_functionality():
     """
     Prueba básica: crear repositorio y verificar estructura.
     """
-    print("=" * 50)
-    print("TEST 1: Funcionalidad básica")
-    print("=" * 50)
+    _p("=" * 50)
+    _p("TEST 1: Funcionalidad básica")
+    _p("=" * 50)
     
     # Crear directorio temporal para pruebas
     with tempfile.TemporaryDirectory() as temp_dir:
-        print(f"📁 Directorio de prueba: {temp_dir}")
+        _p(f"📁 Directorio de prueba: {temp_dir}")
         
-        # Cambiar al directorio temporal
-        original_dir = os.getcwd()
-        os.chdir(temp_dir)
+        # 1. Crear repositorio
+        _p("\n1️⃣ Inicializando repositorio...")
+        repo = Repository(temp_dir)
+        success = repo.init()
         
-        try:
-            # 1. Crear repositorio
-            print("\n1️⃣ Inicializando repositorio...")
-            repo = Repository()
-            success = repo.init()
-            
-            assert success == True, "❌ Error: init() debería retornar True"
-            print("✅ Repositorio inicializado correctamente")
-            
-            # 2. Verificar estructura de carpetas
-            print("\n2️⃣ Verificando estructura...")
-            assert repo.mygit_path.exists(), "❌ Error: carpeta .mygit no existe"
-            assert repo.objects_path.exists(), "❌ Error: carpeta objects no existe"
-            assert repo.config_file.exists(), "❌ Error: config.json no existe"
-            assert repo.staging_file.exists(), "❌ Error: staging.json no existe"
-            assert repo.commits_file.exists(), "❌ Error: commits.json no existe"
-            print("✅ Estructura de carpetas correcta")
-            
-            # 3. Verificar que es repositorio válido
-            print("\n3️⃣ Verificando validez del repositorio...")
-            assert repo.is_repository() == True, "❌ Error: no reconoce repo válido"
-            print("✅ Repositorio reconocido como válido")
-            
-            # 4. Verificar configuración inicial
-            print("\n4️⃣ Verificando configuración...")
-            config = repo.get_config()
-            assert "name" in config, "❌ Error: falta 'name' en config"
-            assert "created" in config, "❌ Error: falta 'created' en config"  
-            assert "last_commit" in config, "❌ Error: falta 'last_commit' en config"
-            assert config["last_commit"] is None, "❌ Error: last_commit debería ser None"
-            print(f"✅ Configuración válida: {config}")
-            
-            # 5. Verificar staging inicial
-            print("\n5️⃣ Verificando staging inicial...")
-            staging = repo.get_staging()
-            assert staging["files"] == [], "❌ Error: staging debería estar vacío"
-            assert staging["timestamp"] is None, "❌ Error: timestamp debería ser None"
-            print("✅ Staging área inicializada correctamente")
-            
-            # 6. Verificar commits inicial
-            print("\n6️⃣ Verificando commits inicial...")
-            commits = repo.get_commits()
-            assert commits == [], "❌ Error: lista de commits debería estar vacía"
-            print("✅ Lista de commits inicializada correctamente")
-            
-            print("\n🎉 TODAS LAS PRUEBAS BÁSICAS PASARON 🎉")
-            
-        finally:
-            # Volver al directorio original
-            os.chdir(original_dir)
+        assert success is True, "❌ Error: init() debería retornar True"
+        _p("✅ Repositorio inicializado correctamente")
+        
+        # 2. Verificar estructura de carpetas
+        _p("\n2️⃣ Verificando estructura...")
+        assert repo.mygit_path.exists(), "❌ Error: carpeta .mygit no existe"
+        assert repo.objects_path.exists(), "❌ Error: carpeta objects no existe"
+        assert repo.config_file.exists(), "❌ Error: config.json no existe"
+        assert repo.staging_file.exists(), "❌ Error: staging.json no existe"
+        assert repo.commits_file.exists(), "❌ Error: commits.json no existe"
+        _p("✅ Estructura de carpetas correcta")
+        
+        # 3. Verificar que es repositorio válido
+        _p("\n3️⃣ Verificando validez del repositorio...")
+        assert repo.is_repository() is True, "❌ Error: no reconoce repo válido"
+        _p("✅ Repositorio reconocido como válido")
+        
+        # 4. Verificar configuración inicial
+        _p("\n4️⃣ Verificando configuración...")
+        config = repo.get_config()
+        assert "name" in config, "❌ Error: falta 'name' en config"
+        assert "created" in config, "❌ Error: falta 'created' en config"  
+        assert "last_commit" in config, "❌ Error: falta 'last_commit' en config"
+        assert config["last_commit"] is None, "❌ Error: last_commit debería ser None"
+        _p(f"✅ Configuración válida: {config}")
+        
+        # 5. Verificar staging inicial
+        _p("\n5️⃣ Verificando staging inicial...")
+        staging = repo.get_staging()
+        assert staging["files"] == [], "❌ Error: staging debería estar vacío"
+        assert staging["timestamp"] is None, "❌ Error: timestamp debería ser None"
+        _p("✅ Staging área inicializada correctamente")
+        
+        # 6. Verificar commits inicial
+        _p("\n6️⃣ Verificando commits inicial...")
+        commits = repo.get_commits()
+        assert commits == [], "❌ Error: lista de commits debería estar vacía"
+        _p("✅ Lista de commits inicializada correctamente")
+        
+        _p("\n🎉 TODAS LAS PRUEBAS BÁSICAS PASARON 🎉")
+
 
 def test_duplicate_init():
     """
     Prueba: intentar inicializar repositorio que ya existe.
     """
-    print("\n" + "=" * 50)
-    print("TEST 2: Inicialización duplicada")
-    print("=" * 50)
+    _p("\n" + "=" * 50)
+    _p("TEST 2: Inicialización duplicada")
+    _p("=" * 50)
     
     with tempfile.TemporaryDirectory() as temp_dir:
-        original_dir = os.getcwd()
-        os.chdir(temp_dir)
+        repo = Repository(temp_dir)
         
-        try:
-            repo = Repository()
-            
-            # Primera inicialización
-            print("1️⃣ Primera inicialización...")
-            success1 = repo.init()
-            assert success1 == True, "❌ Primera init debería funcionar"
-            print("✅ Primera inicialización exitosa")
-            
-            # Segunda inicialización (debería fallar)
-            print("\n2️⃣ Segunda inicialización (debería fallar)...")
-            success2 = repo.init()
-            assert success2 == False, "❌ Segunda init debería retornar False"
-            print("✅ Segunda inicialización correctamente rechazada")
-            
-        finally:
-            os.chdir(original_dir)
+        # Primera inicialización
+        _p("1️⃣ Primera inicialización...")
+        success1 = repo.init()
+        assert success1 is True, "❌ Primera init debería funcionar"
+        _p("✅ Primera inicialización exitosa")
+        
+        # Segunda inicialización (debería fallar)
+        _p("\n2️⃣ Segunda inicialización (debería fallar)...")
+        success2 = repo.init()
+        assert success2 is False, "❌ Segunda init debería retornar False"
+        _p("✅ Segunda inicialización correctamente rechazada")
+
 
 def test_file_hashing():
     """
     Prueba: cálculo de hash de archivos.
     """
-    print("\n" + "=" * 50)
-    print("TEST 3: Cálculo de hash de archivos")
-    print("=" * 50)
+    _p("\n" + "=" * 50)
+    _p("TEST 3: Cálculo de hash de archivos")
+    _p("=" * 50)
     
     with tempfile.TemporaryDirectory() as temp_dir:
-        original_dir = os.getcwd()
-        os.chdir(temp_dir)
+        repo = Repository(temp_dir)
+        repo.init()
+        
+        # Crear archivo de prueba
+        test_file = os.path.join(temp_dir, "test.txt")
+        test_content = "Hola mundo!\nEste es un archivo de prueba."
+        
+        _p(f"1️⃣ Creando archivo: {test_file}")
+        Path(test_file).write_bytes(test_content.encode("utf-8"))
+        
+        # Calcular hash
+        _p("2️⃣ Calculando hash...")
+        file_hash = repo.calculate_file_hash(test_file)
+        
+        # Verificar que el hash tiene formato correcto
+        assert isinstance(file_hash, str), "❌ Hash debería ser string"
+        assert len(file_hash) == HEX_LEN, f"❌ Hash debería tener {HEX_LEN} caracteres, tiene {len(file_hash)}"
+        assert all(c in '0123456789abcdef' for c in file_hash), "❌ Hash debería ser hexadecimal"
         
+        _p(f"✅ Hash calculado correctamente: {file_hash}")
+        
+        # Calcular hash del mismo archivo otra vez (debería ser igual)
+        _p("3️⃣ Verificando consistencia...")
+        file_hash2 = repo.calculate_file_hash(test_file)
+        assert file_hash == file_hash2, "❌ Hash debería ser consistente"
+        _p("✅ Hash es consistente")
+        
+        # Intentar hash de archivo inexistente
+        _p("4️⃣ Probando archivo inexistente...")
         try:
-            repo = Repository()
-            repo.init()
-            
-            # Crear archivo de prueba
-            test_file = "test.txt"
-            test_content = "Hola mundo!\nEste es un archivo de prueba."
-            
-            print(f"1️⃣ Creando archivo: {test_file}")
-            with open(test_file, 'w', encoding='utf-8') as f:
-                f.write(test_content)
-            
-            # Calcular hash
-            print("2️⃣ Calculando hash...")
-            file_hash = repo.calculate_file_hash(test_file)
-            
-            # Verificar que el hash tiene formato correcto
-            assert isinstance(file_hash, str), "❌ Hash debería ser string"
-            assert len(file_hash) == 40, f"❌ Hash SHA-1 debería tener 40 caracteres, tiene {len(file_hash)}"
-            assert all(c in '0123456789abcdef' for c in file_hash), "❌ Hash debería ser hexadecimal"
-            
-            print(f"✅ Hash calculado correctamente: {file_hash}")
-            
-            # Calcular hash del mismo archivo otra vez (debería ser igual)
-            print("3️⃣ Verificando consistencia...")
-            file_hash2 = repo.calculate_file_hash(test_file)
-            assert file_hash == file_hash2, "❌ Hash debería ser consistente"
-            print("✅ Hash es consistente")
-            
-            # Intentar hash de archivo inexistente
-            print("4️⃣ Probando archivo inexistente...")
-            try:
-                repo.calculate_file_hash("archivo_que_no_existe.txt")
-                assert False, "❌ Debería lanzar excepción para archivo inexistente"
-            except Exception as e:
-                print(f"✅ Correctamente lanzó excepción: {e}")
-                
-        finally:
-            os.chdir(original_dir)
+            repo.calculate_file_hash(os.path.join(temp_dir, "archivo_que_no_existe.txt"))
+            assert False, "❌ Debería lanzar excepción para archivo inexistente"
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
+
 
 def test_invalid_repository():
     """
     Prueba: operaciones en directorio sin repositorio.
     """
-    print("\n" + "=" * 50)
-    print("TEST 4: Operaciones sin repositorio")
-    print("=" * 50)
+    _p("\n" + "=" * 50)
+    _p("TEST 4: Operaciones sin repositorio")
+    _p("=" * 50)
     
     with tempfile.TemporaryDirectory() as temp_dir:
-        original_dir = os.getcwd()
-        os.chdir(temp_dir)
+        repo = Repository(temp_dir)
+        
+        # Verificar que NO es repositorio
+        _p("1️⃣ Verificando que NO es repositorio...")
+        assert repo.is_repository() is False, "❌ No debería ser repositorio válido"
+        _p("✅ Correctamente detecta que no es repositorio")
         
+        # Intentar operaciones sin inicializar
+        _p("2️⃣ Probando get_config() sin repo...")
         try:
-            repo = Repository()
-            
-            # Verificar que NO es repositorio
-            print("1️⃣ Verificando que NO es repositorio...")
-            assert repo.is_repository() == False, "❌ No debería ser repositorio válido"
-            print("✅ Correctamente detecta que no es repositorio")
-            
-            # Intentar operaciones sin inicializar
-            print("2️⃣ Probando get_config() sin repo...")
-            try:
-                repo.get_config()
-                assert False, "❌ Debería lanzar excepción"
-            except Exception as e:
-                print(f"✅ Correctamente lanzó excepción: {e}")
+            repo.get_config()
+            assert False, "❌ Debería lanzar excepción"
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
+        
+        _p("3️⃣ Probando get_staging() sin repo...")
+        try:
+            repo.get_staging()
+            assert False, "❌ Debería lanzar excepción"
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
             
-            print("3️⃣ Probando get_staging() sin repo...")
-            try:
-                repo.get_staging()
-                assert False, "❌ Debería lanzar excepción"
-            except Exception as e:
-                print(f"✅ Correctamente lanzó excepción: {e}")
-                
-            print("4️⃣ Probando get_commits() sin repo...")
-            try:
-                repo.get_commits()
-                assert False, "❌ Debería lanzar excepción"  
-            except Exception as e:
-                print(f"✅ Correctamente lanzó excepción: {e}")
-                
+        _p("4️⃣ Probando get_commits() sin repo...")
+        try:
+            repo.get_commits()
+            assert False, "❌ Debería lanzar excepción"  
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
+
+
+def test_add_files_batch():
+    """
+    Prueba: agregar varios archivos al staging en una sola llamada.
+    """
+    _p("\n" + "=" * 50)
+    _p("TEST 5: Agregar archivos en lote")
+    _p("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo = Repository(temp_dir)
+        repo.init()
+
+        for name in ("a.txt", "b.txt"):
+            Path(temp_dir, name).write_bytes(f"contenido de {name}".encode("utf-8"))
+
+        _p("1️⃣ Agregando a.txt y b.txt (a.txt repetido)...")
+        assert repo.add_files(["a.txt", "b.txt", "a.txt"]), "❌ add_files debería retornar True"
+        staging = repo.get_staging()
+        assert staging["files"] == ["a.txt", "b.txt"], f"❌ Staging inesperado: {staging['files']}"
+        assert staging["timestamp"] is not None, "❌ timestamp debería actualizarse"
+        _p("✅ Archivos agregados sin duplicados")
+
+        _p("2️⃣ Probando archivo inexistente en el lote...")
+        try:
+            repo.add_files(["a.txt", "no_existe.txt"])
+            assert False, "❌ Debería lanzar excepción"
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
+
+
+def test_staging_batch():
+    """
+    Prueba: staging_batch() escribe staging.json una sola vez al salir.
+    """
+    _p("\n" + "=" * 50)
+    _p("TEST 6: Lote de cambios en el staging")
+    _p("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo = Repository(temp_dir)
+        repo.init()
+
+        for name in ("a.txt", "b.txt"):
+            Path(temp_dir, name).write_bytes(f"contenido de {name}".encode("utf-8"))
+
+        _p("1️⃣ Agregando archivos dentro de un lote...")
+        with repo.staging_batch():
+            repo.add_file("a.txt")
+            repo.add_file("b.txt")
+            on_disk = Repository(temp_dir)._load_json(repo.staging_file)
+            assert on_disk["files"] == [], "❌ No debería escribir dentro del lote"
+        _p("✅ Sin escrituras dentro del lote")
+
+        _p("2️⃣ Verificando staging.json al salir del lote...")
+        staging = Repository(temp_dir).get_staging()
+        assert staging["files"] == ["a.txt", "b.txt"], f"❌ Staging inesperado: {staging['files']}"
+        _p("✅ Staging escrito una sola vez al final")
+
+
+def test_hash_backend_recorded():
+    """
+    Prueba: el algoritmo de hash se guarda al crear el repo y no se mezcla.
+    """
+    _p("\n" + "=" * 50)
+    _p("TEST 7: Algoritmo de hash del repositorio")
+    _p("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo = Repository(temp_dir)
+        repo.init()
+        Path(temp_dir, "a.txt").write_bytes("contenido".encode("utf-8"))
+
+        _p("1️⃣ Verificando config.json...")
+        assert repo.get_config()["hash"] == "sha1", "❌ config.json debería guardar el algoritmo"
+        _p("✅ Algoritmo guardado en config.json")
+
+        _p("2️⃣ Abriendo el repo con otro MYGIT_HASH...")
+        previous = os.environ.get("MYGIT_HASH")
+        os.environ["MYGIT_HASH"] = "blake3"
+        try:
+            Repository(temp_dir).calculate_file_hash(os.path.join(temp_dir, "a.txt"))
+            assert False, "❌ Debería rechazar un MYGIT_HASH distinto al del repo"
+        except AssertionError:
+            raise
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
         finally:
-            os.chdir(original_dir)
+            if previous is None:
+                del os.environ["MYGIT_HASH"]
+            else:
+                os.environ["MYGIT_HASH"] = previous
+
+        _p("3️⃣ Leyendo un objeto dañado...")
+        content_hash = repo.calculate_file_hash(os.path.join(temp_dir, "a.txt"))
+        repo.write_blob(os.path.join(temp_dir, "a.txt"), content_hash)
+        assert repo.read_object(content_hash) == b"contenido", "❌ Contenido incorrecto"
+        repo.object_path(content_hash).write_bytes(b"otra cosa")
+        try:
+            repo.read_object(content_hash)
+            assert False, "❌ Debería rechazar un objeto que no coincide con su hash"
+        except AssertionError:
+            raise
+        except Exception as e:
+            _p(f"✅ Correctamente lanzó excepción: {e}")
+
 
 def run_all_tests():
     """
@@ -221,6 +309,9 @@ def run_all_tests():
         test_duplicate_init()
         test_file_hashing()
         test_invalid_repository()
+        test_add_files_batch()
+        test_staging_batch()
+        test_hash_backend_recorded()
         
         print("\n" + "🎉" * 20)
         print("🎉 TODAS LAS PRUEBAS PASARON EXITOSAMENTE 🎉")
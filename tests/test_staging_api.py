@@ -1,33 +1,30 @@
-import requests
-import os
-import time
+import pytest
 
-def test_staging_api():
-    base_url = "http://localhost:8000/api"
+# api_client (tests/conftest.py) invoca la app en el mismo proceso contra un
+# repo temporal: no hace falta un backend levantado
+def test_staging_api(api_client):
+    client = api_client
     test_file = "staging_test.txt"
-    file_path = os.path.join("backend", "mini_git_repo", test_file)
 
     # 1. Crear archivo
-    r = requests.post(f"{base_url}/add", json=[{"name": test_file, "content": "linea1\n"}])
+    r = client.post("/api/add", json=[{"name": test_file, "content": "linea1\n"}])
     assert r.status_code == 200
     # 2. Quitar del staging
-    r = requests.post(f"{base_url}/unstage/{test_file}")
+    r = client.post(f"/api/unstage/{test_file}")
     assert r.status_code == 200
     data = r.json()
     assert data["success"]
     # 3. Agregar al staging
-    r = requests.post(f"{base_url}/stage/{test_file}")
+    r = client.post(f"/api/stage/{test_file}")
     assert r.status_code == 200
     data = r.json()
     assert data["success"]
     # 4. Verificar que el archivo está en staging consultando status
-    r = requests.get(f"{base_url}/status")
+    r = client.get("/api/status")
     assert r.status_code == 200
     status = r.json()
     assert test_file in status["staged_files"]
-    # 5. Limpiar
-    os.remove(file_path)
     print("Test de staging API PASÓ correctamente.")
 
 if __name__ == "__main__":
-    test_staging_api()
+    raise SystemExit(pytest.main([__file__]))